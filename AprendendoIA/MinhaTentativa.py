@@ -1,21 +1,23 @@
-from sentence_transformers import SentenceTransformer
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-import requests
+
+import _curso  # noqa: F401  (torna a pasta curso/ importável)
+from modelos import obter_modelo
+from cache_consultas import obter_cache_consultas
+from busca_vetorial import normalizar, buscar_top_k
+from cliente_http import buscar_json
+from cache_respostas import em_cache
 
 print("Aprendendo a usar  embendding")
 
-def buscar_rea(assunto):
+@em_cache("medcred")
+def buscar_rea(assunto, limite=1):
     url = "https://api.mecred.c3sl.ufpr.br/public/elastic/search"
     params = {
         "indexes": "resources",
         "query": assunto,
-        "limit": 1
+        "limit": limite
     }
 
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    return response.json()
+    return buscar_json(url, params=params)
 
 
 # TESTE
@@ -36,7 +38,7 @@ for i, r in enumerate(items, 1):
 
 
 
-modelo = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+modelo = obter_modelo()
 
 print("Processando aulas: ")
 print(f"\nQuantidade de aulas disponíveis:{len(items)}")
@@ -47,23 +49,20 @@ for aula in items:
     textos_para_embedding.append(texto)
 
 # Gera os embeddings com os textos
-embenddings = modelo.encode(textos_para_embedding)
+embenddings = normalizar(modelo.encode(textos_para_embedding))
 materiaUsuário = input()
 def buscar_materia(consulta_usuario,topn=3,similaridade_minima=0.3):
-    embenddings_consulta =modelo.encode([consulta_usuario])
-    similaridades= cosine_similarity(embenddings_consulta,embenddings)[0]
-    indices_ordenados=np.argsort(similaridades)[::-1]
+    embenddings_consulta =obter_cache_consultas().codificar(
+        consulta_usuario, lambda texto: modelo.encode([texto])
+    )
+    indices,similaridades=buscar_top_k(embenddings_consulta,embenddings,topn,similaridade_minima)[0]
     resultados=[]
-    for indx in indices_ordenados:
-        similaridade =similaridades[indx]
-        if similaridade>=similaridade_minima:
-            resultado={
-                **items[indx],
-                "relevancia":float(similaridade)
-            }
-            resultados.append(resultado)
-            if len(resultados)>=topn:
-                break        
+    for indx,similaridade in zip(indices,similaridades):
+        resultado={
+            **items[indx],
+            "relevancia":float(similaridade)
+        }
+        resultados.append(resultado)
     return resultados
 
 print(f"\nConsulta: {materiaUsuário}")
@@ -0,0 +1,9 @@
+"""Deixa os módulos compartilhados da pasta curso/ importáveis pelos scripts desta pasta"""
+
+import os
+import sys
+
+PASTA_CURSO = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'curso')
+
+if PASTA_CURSO not in sys.path:
+    sys.path.append(PASTA_CURSO)
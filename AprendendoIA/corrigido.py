@@ -1,24 +1,26 @@
-from sentence_transformers import SentenceTransformer
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-import requests
+
+import _curso  # noqa: F401  (torna a pasta curso/ importável)
+from modelos import obter_modelo
+from cache_consultas import obter_cache_consultas
+from busca_vetorial import normalizar, buscar_top_k
+from cliente_http import buscar_json
+from cache_respostas import em_cache
 
 print("Aprendendo a usar embendding")
 print("Carregando modelo... (isso pode demorar na primeira vez)")
 
 # Carrega o modelo UMA VEZ no início
-modelo = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+modelo = obter_modelo()
 
-def buscar_rea(assunto):
+@em_cache("medcred")
+def buscar_rea(assunto, limite=40):
     url = "https://api.mecred.c3sl.ufpr.br/public/elastic/search"
     params = {
         "indexes": "resources",
         "query": assunto,
-        "limit": 40
+        "limit": limite
     }
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    return response.json()
+    return buscar_json(url, params=params)
 
 # Pergunta primeiro o que o usuário quer buscar
 print("Qual matéria você quer pesquisar?")
@@ -39,25 +41,24 @@ for aula in items:
         texto += ' ' + aula.get('description', '')
     textos_para_embedding.append(texto)
 
-# Gera os embeddings
-embenddings = modelo.encode(textos_para_embedding)
+# Gera os embeddings (já normalizados uma vez só, para a busca virar produto escalar)
+embenddings = normalizar(modelo.encode(textos_para_embedding))
 
 def buscar_materia(consulta_usuario, topn=5, similaridade_minima=0.3):
-    embenddings_consulta = modelo.encode([consulta_usuario])
-    similaridades = cosine_similarity(embenddings_consulta, embenddings)[0]
-    indices_ordenados = np.argsort(similaridades)[::-1]
+    embenddings_consulta = obter_cache_consultas().codificar(
+        consulta_usuario, lambda texto: modelo.encode([texto])
+    )
+    indices, similaridades = buscar_top_k(
+        embenddings_consulta, embenddings, topn, similaridade_minima
+    )[0]
     resultados = []
     
-    for indx in indices_ordenados:
-        similaridade = similaridades[indx]
-        if similaridade >= similaridade_minima:
-            resultado = {
-                **items[indx],
-                "relevancia": float(similaridade)
-            }
-            resultados.append(resultado)
-            if len(resultados) >= topn:
-                break        
+    for indx, similaridade in zip(indices, similaridades):
+        resultado = {
+            **items[indx],
+            "relevancia": float(similaridade)
+        }
+        resultados.append(resultado)
     return resultados
 
 print(f"\nConsulta: {materiaUsuário}")
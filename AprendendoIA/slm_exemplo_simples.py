@@ -9,11 +9,17 @@ print("🤖 Exemplo Simples de SLM - Classificação de Texto\n")
 # Instalação necessária (descomente se precisar):
 # !pip install transformers datasets torch scikit-learn
 
-from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification, Trainer, TrainingArguments
-from datasets import Dataset
+from transformers import AutoTokenizer, AutoModelForSequenceClassification, Trainer, TrainingArguments
+import json
 import numpy as np
 import os
 
+import _curso  # noqa: F401  (torna a pasta curso/ importável)
+from treino_slm import ARQUIVO_MEDICOES, MODO_PADDING, opcoes_treino, registrar_vazao
+from inferencia_slm import ClassificadorSLM
+from cache_tokens import carregar_tokenizado, gravar_linhas, ler_linhas
+from exportar_slm import exportar_e_comparar
+
 # ============================================================================
 # PASSO 1: Criar dados de treinamento
 # ============================================================================
@@ -47,93 +53,6 @@ dados = {
 
 categorias_nomes = {0: "Tecnologia", 1: "Esportes", 2: "Comida"}
 
-dataset = Dataset.from_dict(dados)
-print(f"✓ Dataset criado: {len(dataset)} exemplos")
-print(f"✓ Categorias: {list(categorias_nomes.values())}\n")
-
-# ============================================================================
-# PASSO 2: Carregar modelo pequeno (com treinamento incremental)
-# ============================================================================
-
-print("🔧 PASSO 2: Carregando modelo\n")
-
-# Verificar se já existe um modelo treinado anteriormente
-CAMINHO_MODELO_SALVO = "./meu_slm_categorias"
-
-if os.path.exists(CAMINHO_MODELO_SALVO):
-    print("📂 Modelo anterior encontrado! Continuando treinamento...")
-    print("   (Isso vai MELHORAR o modelo existente)\n")
-    modelo_nome = CAMINHO_MODELO_SALVO
-    eh_continuacao = True
-else:
-    print("🆕 Primeiro treinamento! Usando modelo base...\n")
-    modelo_nome = "distilbert-base-multilingual-cased"
-    eh_continuacao = False
-
-tokenizer = AutoTokenizer.from_pretrained(modelo_nome)
-modelo = AutoModelForSequenceClassification.from_pretrained(
-    modelo_nome,
-    num_labels=3  # 3 categorias
-)
-
-if eh_continuacao:
-    print(f"✓ Modelo: {CAMINHO_MODELO_SALVO} (Treinamento Contínuo)")
-else:
-    print(f"✓ Modelo: {modelo_nome} (Novo)")
-print(f"✓ Parâmetros: {modelo.num_parameters():,}\n")
-
-# ============================================================================
-# PASSO 3: Preparar dados
-# ============================================================================
-
-print("⚙️ PASSO 3: Tokenizando dados\n")
-
-def tokenizar(batch):
-    return tokenizer(batch['texto'], padding='max_length', truncation=True, max_length=64)
-
-dataset_preparado = dataset.map(tokenizar, batched=True)
-dataset_preparado = dataset_preparado.rename_column("categoria", "labels")
-
-print("✓ Dados tokenizados e prontos!\n")
-
-# ============================================================================
-# PASSO 4: Treinar
-# ============================================================================
-
-print("🚀 PASSO 4: Treinando modelo\n")
-
-argumentos = TrainingArguments(
-    output_dir="./modelo_categorias",
-    num_train_epochs=5,
-    per_device_train_batch_size=4,
-    learning_rate=3e-5,
-    logging_steps=2,
-    save_total_limit=1,
-)
-
-treinador = Trainer(
-    model=modelo,
-    args=argumentos,
-    train_dataset=dataset_preparado,
-)
-
-print("Iniciando treinamento (pode demorar 1-2 minutos)...\n")
-treinador.train()
-print("\n✓ Treinamento concluído!\n")
-
-# ============================================================================
-# PASSO 5: Testar
-# ============================================================================
-
-print("🧪 PASSO 5: Testando modelo treinado\n")
-
-# Criar pipeline para facilitar as predições
-classificador = pipeline(
-    "text-classification",
-    model=modelo,
-    tokenizer=tokenizer
-)
-
 # Textos de teste
 testes = [
     "Aprendi a programar em Python hoje",
@@ -142,35 +61,193 @@ testes = [
     "Deep learning é fascinante",
     "O time ganhou de 2 a 0"
 ]
+# Categoria certa de cada teste (não entram no treino)
+testes_categorias = [0, 1, 2, 0, 1]
 
-print("Resultados das predições:")
-print("-" * 60)
+# Os dados de treino ficam num arquivo (JSONL ou CSV com texto e categoria).
+# Na primeira vez ele é criado com os exemplos acima; depois é só
+# acrescentar linhas novas a ele para continuar o treinamento.
+CAMINHO_DADOS = os.getenv("SLM_DADOS", "./dados_categorias.jsonl")
+if not os.path.exists(CAMINHO_DADOS):
+    gravar_linhas(CAMINHO_DADOS, dados, ["texto", "categoria"])
 
-for texto in testes:
-    resultado = classificador(texto)[0]
-    label_num = int(resultado['label'].split('_')[1])
-    categoria = categorias_nomes[label_num]
-    confianca = resultado['score']
-    
-    print(f"\n📝 Texto: {texto}")
-    print(f"✓ Categoria: {categoria} (Confiança: {confianca:.1%})")
+print(f"✓ Dados de treino: {CAMINHO_DADOS}")
+print(f"✓ Categorias: {list(categorias_nomes.values())}\n")
+
+CAMINHO_MODELO_SALVO = "./meu_slm_categorias"
+CAMINHO_CABECA_SALVA = "./meu_slm_categorias_cabeca.joblib"
 
 # ============================================================================
-# BONUS: Salvar o modelo
+# MODO RÁPIDO: embeddings congelados + cabeça leve (SLM_MODO=logistica ou mlp)
 # ============================================================================
+# Em vez de ajustar o DistilBERT inteiro, usa o MiniLM do resto do projeto
+# congelado e treina só uma regressão logística (ou MLP) nos embeddings.
+
+MODO_TREINO = os.getenv("SLM_MODO", "finetuning")
+
+
+def treinar_cabeca(modo):
+    """Treina só a cabeça sobre o MiniLM congelado e compara com o DistilBERT ajustado"""
+    from cabeca_embeddings import ClassificadorEmbeddings
+    from exportar_slm import medir
+
+    print(f"⚡ Modo rápido: MiniLM congelado + cabeça '{modo}'\n")
+    linhas = list(ler_linhas(CAMINHO_DADOS))
+    cabeca = ClassificadorEmbeddings(categorias_nomes, modo).treinar(
+        [linha['texto'] for linha in linhas], [int(linha['categoria']) for linha in linhas]
+    )
+    print(f"✓ Treino: embeddings {cabeca.tempos['embeddings_s']:.2f}s + ajuste {cabeca.tempos['ajuste_s']:.3f}s\n")
+
+    categorias, confiancas = cabeca.classificar(testes)
+    for texto, categoria, confianca in zip(testes, categorias, confiancas):
+        print(f"📝 {texto} -> {categoria} ({confianca:.1%})")
+    cabeca.salvar(CAMINHO_CABECA_SALVA)
+
+    # Comparação com o DistilBERT ajustado, se ele já foi treinado antes
+    print("\n📊 Latência e acurácia nos testes:")
+    print(f"  cabeça {modo}: {medir(cabeca, testes, np.array(testes_categorias))}")
+    if os.path.exists(CAMINHO_MODELO_SALVO):
+        ajustado = ClassificadorSLM.carregar(CAMINHO_MODELO_SALVO, categorias_nomes, max_length=64)
+        print(f"  fine-tuning: {medir(ajustado, testes, np.array(testes_categorias))}")
+        if os.path.exists(ARQUIVO_MEDICOES):
+            with open(ARQUIVO_MEDICOES, encoding="utf-8") as arquivo:
+                for modo_padding, medicao in json.load(arquivo).get("slm_exemplo_simples", {}).items():
+                    print(f"  tempo de treino do fine-tuning ({modo_padding}): {medicao['tempo_s']:.1f}s")
+    else:
+        print("  (rode sem SLM_MODO para treinar o DistilBERT e comparar)")
 
-print("\n" + "=" * 60)
-print("💾 Salvando modelo...")
 
-modelo.save_pretrained(CAMINHO_MODELO_SALVO)
-tokenizer.save_pretrained(CAMINHO_MODELO_SALVO)
+# ============================================================================
+# MODO PADRÃO: fine-tuning do DistilBERT (PASSOS 2 a 5)
+# ============================================================================
 
-if eh_continuacao:
-    print(f"✓ Modelo ATUALIZADO e salvo em: {CAMINHO_MODELO_SALVO}")
-    print("  (Na próxima execução, vai continuar melhorando!)")
+def ajustar_distilbert():
+    """Ajusta o DistilBERT nos dados (continuando o modelo salvo, se houver), testa e salva"""
+    # ============================================================================
+    # PASSO 2: Carregar modelo pequeno (com treinamento incremental)
+    # ============================================================================
+
+    print("🔧 PASSO 2: Carregando modelo\n")
+
+    # Verificar se já existe um modelo treinado anteriormente
+    if os.path.exists(CAMINHO_MODELO_SALVO):
+        print("📂 Modelo anterior encontrado! Continuando treinamento...")
+        print("   (Isso vai MELHORAR o modelo existente)\n")
+        modelo_nome = CAMINHO_MODELO_SALVO
+        eh_continuacao = True
+    else:
+        print("🆕 Primeiro treinamento! Usando modelo base...\n")
+        modelo_nome = "distilbert-base-multilingual-cased"
+        eh_continuacao = False
+
+    tokenizer = AutoTokenizer.from_pretrained(modelo_nome)
+    modelo = AutoModelForSequenceClassification.from_pretrained(
+        modelo_nome,
+        num_labels=3,  # 3 categorias
+        # Os nomes ficam salvos junto com o modelo (usados pelo inferencia_slm.py)
+        id2label=categorias_nomes,
+        label2id={nome: num for num, nome in categorias_nomes.items()},
+    )
+
+    if eh_continuacao:
+        print(f"✓ Modelo: {CAMINHO_MODELO_SALVO} (Treinamento Contínuo)")
+    else:
+        print(f"✓ Modelo: {modelo_nome} (Novo)")
+    print(f"✓ Parâmetros: {modelo.num_parameters():,}\n")
+
+    # ============================================================================
+    # PASSO 3: Preparar dados
+    # ============================================================================
+
+    print("⚙️ PASSO 3: Tokenizando dados\n")
+
+    # Só trunca: o padding é feito por batch, até o maior texto de cada um
+    # (SLM_PADDING=fixo completa tudo até max_length, como antes).
+    # A tokenização fica num cache em disco (Arrow, mapeado em memória): nas
+    # próximas execuções só as linhas novas ou alteradas do arquivo são tokenizadas.
+    dataset_preparado, linhas_tokenizadas = carregar_tokenizado(CAMINHO_DADOS, tokenizer, max_length=64)
+
+    print(f"✓ {len(dataset_preparado)} exemplos prontos, {linhas_tokenizadas} tokenizados agora "
+          f"(padding {MODO_PADDING})\n")
+
+    # ============================================================================
+    # PASSO 4: Treinar
+    # ============================================================================
+
+    print("🚀 PASSO 4: Treinando modelo\n")
+
+    # group_by_length junta textos de tamanho parecido; o coletor faz o padding
+    opcoes_argumentos, opcoes_treinador = opcoes_treino(tokenizer)
+    EPOCAS = 5
+
+    argumentos = TrainingArguments(
+        output_dir="./modelo_categorias",
+        num_train_epochs=EPOCAS,
+        per_device_train_batch_size=4,
+        learning_rate=3e-5,
+        logging_steps=2,
+        save_total_limit=1,
+        **opcoes_argumentos,
+    )
+
+    treinador = Trainer(
+        model=modelo,
+        args=argumentos,
+        train_dataset=dataset_preparado,
+        **opcoes_treinador,
+    )
+
+    print("Iniciando treinamento (pode demorar 1-2 minutos)...\n")
+    resultado_treino = treinador.train()
+    print("\n✓ Treinamento concluído!\n")
+    registrar_vazao("slm_exemplo_simples", dataset_preparado, resultado_treino, EPOCAS)
+
+    # ============================================================================
+    # PASSO 5: Testar
+    # ============================================================================
+
+    print("🧪 PASSO 5: Testando modelo treinado\n")
+
+    # Classifica todos os textos em lote, sem calcular gradientes
+    classificador = ClassificadorSLM(modelo, tokenizer, categorias_nomes, max_length=64)
+
+    print("Resultados das predições:")
+    print("-" * 60)
+
+    categorias, confiancas = classificador.classificar(testes)
+
+    for texto, categoria, confianca in zip(testes, categorias, confiancas):
+        print(f"\n📝 Texto: {texto}")
+        print(f"✓ Categoria: {categoria} (Confiança: {confianca:.1%})")
+
+    # ============================================================================
+    # BONUS: Salvar o modelo
+    # ============================================================================
+
+    print("\n" + "=" * 60)
+    print("💾 Salvando modelo...")
+
+    modelo.save_pretrained(CAMINHO_MODELO_SALVO)
+    tokenizer.save_pretrained(CAMINHO_MODELO_SALVO)
+
+    # SLM_EXPORTAR=1 gera as versões int8 e ONNX e compara com o fp32 nos testes;
+    # o ClassificadorSLM.carregar passa a usar a mais rápida
+    if os.getenv("SLM_EXPORTAR") == "1":
+        print("\n⚡ Exportando versões otimizadas para CPU...")
+        exportar_e_comparar(CAMINHO_MODELO_SALVO, testes, testes_categorias, max_length=64)
+
+    if eh_continuacao:
+        print(f"✓ Modelo ATUALIZADO e salvo em: {CAMINHO_MODELO_SALVO}")
+        print("  (Na próxima execução, vai continuar melhorando!)")
+    else:
+        print(f"✓ Modelo NOVO salvo em: {CAMINHO_MODELO_SALVO}")
+        print("  (Na próxima execução, vai usar este como base!)")
+    print("\n" + "=" * 60)
+    print("✨ Exemplo concluído com sucesso!")
+    print("=" * 60)
+
+
+if MODO_TREINO in ("logistica", "mlp"):
+    treinar_cabeca(MODO_TREINO)
 else:
-    print(f"✓ Modelo NOVO salvo em: {CAMINHO_MODELO_SALVO}")
-    print("  (Na próxima execução, vai usar este como base!)")
-print("\n" + "=" * 60)
-print("✨ Exemplo concluído com sucesso!")
-print("=" * 60)
+    ajustar_distilbert()
@@ -19,6 +19,9 @@ from sentence_transformers import SentenceTransformer
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 
+import _curso  # noqa: F401  (torna a pasta curso/ importável)
+from busca_vetorial import normalizar, buscar_top_k
+
 print("=" * 70)
 print("PARTE 1: Criando Embeddings de Texto")
 print("=" * 70)
@@ -81,24 +84,23 @@ documentos = [
     "Embeddings transformam texto em vetores numéricos"
 ]
 
-# Criar embeddings dos documentos
-doc_embeddings = modelo.encode(documentos)
+# Criar embeddings dos documentos (normalizados uma única vez: norma 1)
+doc_embeddings = normalizar(modelo.encode(documentos))
 
 # Consulta do usuário
 consulta = "Como funciona inteligência artificial?"
 consulta_embedding = modelo.encode([consulta])
 
-# Encontrar documentos mais similares
-similaridades_consulta = cosine_similarity(consulta_embedding, doc_embeddings)[0]
-
-# Ordenar por similaridade
-indices_ordenados = np.argsort(similaridades_consulta)[::-1]
+# Com vetores de norma 1, o cosseno é só um produto escalar.
+# buscar_top_k usa np.argpartition para separar os 3 melhores sem
+# ordenar a base inteira (faz diferença com milhares de documentos)
+indices_top, similaridades_top = buscar_top_k(consulta_embedding, doc_embeddings, k=3)[0]
 
 print(f"\nConsulta: '{consulta}'")
 print("\nDocumentos mais relevantes:")
 print("-" * 70)
-for i, idx in enumerate(indices_ordenados[:3], 1):
-    print(f"{i}. [{similaridades_consulta[idx]:.4f}] {documentos[idx]}")
+for i, (idx, sim) in enumerate(zip(indices_top, similaridades_top), 1):
+    print(f"{i}. [{sim:.4f}] {documentos[idx]}")
 
 # ============================================================================
 # PARTE 4: Embeddings Personalizados (Exemplo Simples)
@@ -33,8 +33,13 @@ from transformers import (
     Trainer
 )
 from datasets import Dataset
-import torch
 import numpy as np
+import os
+
+import _curso  # noqa: F401  (torna a pasta curso/ importável)
+from treino_slm import funcao_tokenizar, opcoes_treino, registrar_vazao
+from inferencia_slm import ClassificadorSLM
+from exportar_slm import exportar_e_comparar
 
 # Dados de exemplo para classificação de sentimentos
 dados_treinamento = {
@@ -72,21 +77,20 @@ nome_modelo = "distilbert-base-multilingual-cased"  # ~135M parâmetros (pequeno
 
 print(f"\nCarregando modelo: {nome_modelo}")
 tokenizer = AutoTokenizer.from_pretrained(nome_modelo)
+sentimentos_nomes = {0: "NEGATIVO 😞", 1: "POSITIVO 😊"}
 modelo = AutoModelForSequenceClassification.from_pretrained(
     nome_modelo,
-    num_labels=2  # 2 classes: positivo/negativo
+    num_labels=2,  # 2 classes: positivo/negativo
+    id2label=sentimentos_nomes,
+    label2id={nome: num for num, nome in sentimentos_nomes.items()},
 )
 
 print(f"Modelo carregado! Parâmetros: {modelo.num_parameters():,}")
 
 # Função para tokenizar os textos
-def tokenizar(exemplos):
-    return tokenizer(
-        exemplos['texto'],
-        padding='max_length',
-        truncation=True,
-        max_length=128
-    )
+# Sem padding aqui: cada batch é completado só até o seu maior texto
+# (padding dinâmico). SLM_PADDING=fixo completa tudo até 128, para comparar.
+tokenizar = funcao_tokenizar(tokenizer, 'texto', max_length=128)
 
 # Tokenizar o dataset
 dataset_tokenizado = dataset.map(tokenizar, batched=True)
@@ -102,6 +106,9 @@ print("\n" + "=" * 70)
 print("PARTE 3: Treinamento do Modelo")
 print("=" * 70)
 
+# Padding dinâmico + textos de tamanho parecido no mesmo batch
+opcoes_argumentos, opcoes_treinador = opcoes_treino(tokenizer)
+
 # Configurações de treinamento
 args_treinamento = TrainingArguments(
     output_dir="./modelo_treinado",
@@ -112,6 +119,7 @@ args_treinamento = TrainingArguments(
     save_steps=10,
     eval_strategy="no",               # Sem validação neste exemplo simples
     save_total_limit=1,
+    **opcoes_argumentos,              # group_by_length=True
 )
 
 # Criar o treinador
@@ -119,6 +127,7 @@ treinador = Trainer(
     model=modelo,
     args=args_treinamento,
     train_dataset=dataset_tokenizado,
+    **opcoes_treinador,               # DataCollatorWithPadding
 )
 
 print("\nIniciando treinamento...")
@@ -129,6 +138,7 @@ resultado = treinador.train()
 
 print(f"\nTreinamento concluído!")
 print(f"Loss final: {resultado.training_loss:.4f}")
+registrar_vazao("tutorial_slm_treinamento", dataset_tokenizado, resultado, args_treinamento.num_train_epochs)
 
 # ============================================================================
 # PARTE 4: Testando o Modelo Treinado
@@ -138,19 +148,13 @@ print("\n" + "=" * 70)
 print("PARTE 4: Testando o Modelo")
 print("=" * 70)
 
-def prever_sentimento(texto):
-    """Função para prever o sentimento de um novo texto"""
-    inputs = tokenizer(texto, return_tensors="pt", padding=True, truncation=True)
-    
-    with torch.no_grad():
-        outputs = modelo(**inputs)
-    
-    probabilidades = torch.softmax(outputs.logits, dim=1)
-    predicao = torch.argmax(probabilidades, dim=1).item()
-    confianca = probabilidades[0][predicao].item()
-    
-    sentimento = "POSITIVO 😊" if predicao == 1 else "NEGATIVO 😞"
-    return sentimento, confianca
+# Classificador em lote: tokeniza vários textos juntos (padding só até o
+# maior de cada batch) e roda o modelo em torch.inference_mode()
+classificador = ClassificadorSLM(modelo, tokenizer, sentimentos_nomes, batch_size=32, max_length=128)
+
+def prever_sentimentos(textos):
+    """Sentimentos e confianças (arrays) para uma lista, ou gerador, de textos"""
+    return classificador.classificar(textos)
 
 # Testar com novos textos
 textos_teste = [
@@ -158,12 +162,13 @@ textos_teste = [
     "Não gostei, muito caro",
     "Recomendo para todos, excelente qualidade"
 ]
+sentimentos_teste = [1, 0, 1]  # respostas certas (não entram no treino)
 
 print("\nTestando o modelo com novos textos:")
 print("-" * 70)
 
-for texto in textos_teste:
-    sentimento, confianca = prever_sentimento(texto)
+sentimentos, confiancas = prever_sentimentos(textos_teste)
+for texto, sentimento, confianca in zip(textos_teste, sentimentos, confiancas):
     print(f"\nTexto: {texto}")
     print(f"Sentimento: {sentimento} (Confiança: {confianca:.2%})")
 
@@ -184,6 +189,13 @@ print(f"\nModelo salvo em: {caminho_salvar}")
 print("\nPara carregar depois, use:")
 print(f"modelo = AutoModelForSequenceClassification.from_pretrained('{caminho_salvar}')")
 print(f"tokenizer = AutoTokenizer.from_pretrained('{caminho_salvar}')")
+# Versões otimizadas para CPU (int8 e ONNX), comparadas com o original
+if os.getenv("SLM_EXPORTAR") == "1":
+    print("\nExportando versões int8 e ONNX...")
+    exportar_e_comparar(caminho_salvar, textos_teste, sentimentos_teste)
+
+print("\nPara classificar um arquivo grande em lote:")
+print(f"python curso/inferencia_slm.py {caminho_salvar} textos.txt --saida sentimentos.jsonl")
 
 # ============================================================================
 # CONCEITOS IMPORTANTES
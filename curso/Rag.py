@@ -1,141 +1,204 @@
-from sentence_transformers import SentenceTransformer
+import asyncio
+import heapq
+import sys
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-import requests
 from dotenv import load_dotenv
 import os
+from modelos import aquecer_modelos, obter_modelo, MODELO_PADRAO
+from cache_embeddings import obter_cache, completar
+from codificador import obter_codificador
+from cache_consultas import obter_cache_consultas
+from busca_vetorial import normalizar, selecionar_top_k
+from fontes import buscar_todas, buscar_conforme_chegam
+from formatacao import formatar, escrever_texto, escrever_jsonl
+from indice_local import obter_indice_local
+from bm25 import IndiceBM25, completar_prefiltro, fundir, texto_lexico
+from reranqueamento import obter_reranqueador
+from documentos import preparar_documentos, agregar
 
 load_dotenv()
 token = os.getenv("HF_TOKEN")
-def buscarReaMedcred(assunto):
-    url = "https://api.mecred.c3sl.ufpr.br/public/elastic/search"
-    params = {
-        "indexes":"resources",
-        "query":assunto,
-        "limit":30
-    }
-    response = requests.get(url,params = params)
-    response.raise_for_status()
-    return response.json()
-def buscarReaEduplay(assunto):
-    url = "https://eduplay.rnp.br/api/v1/search"
-    params = {
-         "term":assunto,
-         "quantity":30,
-         "page":1,
-         "type":0,
-         "order":0
-    }
-    response = requests.get(url, params=params)
-    response.raise_for_status()
-    return response.json()
-
-def buscarReaAquarela(assunto):
-    return
-    
-def retrieve (query:str, top_k:int=5):
-    modelo = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
-
-    dadosTodosTexto = []
-    dadosTodosDicionario = []
-    resultadoMEdcred = buscarReaMedcred(query)
-    if isinstance(resultadoMEdcred, dict):
-     dadosMedcredDicionario = resultadoMEdcred.get("results", [])
-    elif isinstance(resultadoMEdcred, list):
-     dadosMedcredDicionario = resultadoMEdcred
+def codificarComCache(textos, extras=()):
+    """
+    Vetores dos `textos` (pedaços dos recursos, usando o cache em disco) e dos
+    `extras` (ex.: a consulta, fora do cache). Os textos se repetem muito entre
+    consultas: só os novos vão para o modelo, junto com os extras, numa única
+    chamada ao encode (compartilhada com outros pedidos simultâneos).
+    """
+    cache = obter_cache()
+    vetores = cache.consultar(MODELO_PADRAO, textos)
+    faltando = [texto for texto, vetor in zip(textos, vetores) if vetor is None]
+    if not faltando and not extras:
+        return np.stack(vetores), None
+    novos = obter_codificador(MODELO_PADRAO).executar(list(extras) + faltando)
+    if faltando:
+        cache.guardar(MODELO_PADRAO, faltando, novos[len(extras):])
+        completar(vetores, novos[len(extras):])
+    return np.stack(vetores), novos[:len(extras)]
+
+def codificarConsulta(query, nomeModelo=MODELO_PADRAO):
+    """Vetor da consulta; consultas repetidas (mesmo normalizadas) não passam pelo modelo"""
+    return obter_cache_consultas(nomeModelo).codificar(
+        query, lambda texto: obter_codificador(nomeModelo).executar([texto])
+    )
+
+def pontuarItens(query, itens, embbendingConsulta=None):
+    """
+    Similaridade de cada item com a consulta: os itens viram pedaços de
+    título + descrição (documentos.py), que são pontuados e agregados por item.
+    """
+    textos, donos = preparar_documentos(itens, obter_modelo(MODELO_PADRAO))
+    # Consulta repetida sai do cache; senão vai junto com os pedaços novos
+    cacheConsultas = obter_cache_consultas(MODELO_PADRAO)
+    if embbendingConsulta is None:
+        embbendingConsulta = cacheConsultas.obter(query)
+    if embbendingConsulta is None:
+        vetoresPedacos, embbendingConsulta = codificarComCache(textos, [query])
+        cacheConsultas.guardar(query, embbendingConsulta)
     else:
-     dadosMedcredDicionario = []
-
-    resultadoEduplay = buscarReaEduplay(query)
-    if isinstance(resultadoEduplay, dict):
-     dadosEduplayDicionario = resultadoEduplay.get("contents", [])
-    for item in dadosMedcredDicionario:
-        item['fonte'] ='medcred'
-        dadosTodosDicionario.append(item)
-    for item in dadosEduplayDicionario:
-        item['fonte'] ='eduplay'
-        dadosTodosDicionario.append(item)
- 
-    for dados in dadosMedcredDicionario:
-        nomematerial = dados.get('name',[])
-        dadosTodosTexto.append(nomematerial)
-    for dados in dadosEduplayDicionario:
-        nomematerial = dados.get('name',[])
-        dadosTodosTexto.append(nomematerial)
-
-    embbendingdadosREAs = modelo.encode(dadosTodosTexto)
-    embbendingConsulta = modelo.encode([query])
-    
-    similaridades = cosine_similarity(embbendingConsulta,embbendingdadosREAs)[0]
-    indices_ordenados = np.argsort(similaridades)[::-1]
-
-    topKtotal = []
- 
-    for indx in indices_ordenados:
-        similaridade = similaridades[indx]
-        resultado = {
-        **dadosTodosDicionario[indx],
-        "relevancia":float(similaridade)
-        }
-        topKtotal.append(resultado)
-        
-        if len(topKtotal)>=top_k:
-            break
-   
-    return topKtotal
-
-def formatacaoDadosMedCred(listadados):
-    frasefinal =[]
-    for dados in listadados:
-        usuarioNome = dados.get('user',{}).get('name','Desconhecido')
-        nomematerial = dados.get('name','Sem título')
-        views = dados.get('views',"Não descrito")
-        likes = dados.get('likes',"Não descrito")
-        relevancia = dados.get('relevancia',"Erro")
-        fraseMomentanea = f" Título do material: {nomematerial}, views do material: {views}, likes do material: {likes}, dono do material: {usuarioNome}, relevância em relação ao tema: {relevancia} \n"
-        frasefinal.append(fraseMomentanea)
-    return "\n".join (frasefinal)
-
-def formatacaoDadosEduplay(listadados):
-    frasefinal =[]
-    for dados in listadados:
-        nomeMaterial = dados.get('name','Sem título')
-        descricao = dados.get('description','Sem descricao')
-        contenttype = dados.get('contentType',"Desconhecido")
-        userOwner = dados.get('userOwner',{}).get('name','Desconhecido')
-        link = dados.get('embedUrl','Não possui')
-        fraseMomentanea = f"Título do material: {nomeMaterial}, descrição do material: {descricao},  tipo de material: {contenttype}, dono do material: {userOwner}, link do material: {link} \n"
-        frasefinal.append(fraseMomentanea)
-    return "\n".join(frasefinal)
+        vetoresPedacos, _ = codificarComCache(textos)
+    similaridadesPedacos = normalizar(vetoresPedacos) @ normalizar(embbendingConsulta).ravel()
+    return agregar(similaridadesPedacos, donos, itens)
+
+def retrieve (query:str, top_k:int=5, modo:str="online", lexico:str=None, reranquear:bool=False):
+    """
+    modo="online": consulta as APIs na hora e ordena os resultados delas.
+    modo="local": busca no índice gerado pelo ingestao.py, sem rede.
+    Devolve uma lista de Recurso (fontes.py) com a `relevancia` preenchida.
+
+    lexico: junta a busca BM25 (nome + descrição) com a vetorial.
+    "rrf" ou "ponderado" fundem os dois rankings; "prefiltro" usa a BM25
+    para escolher os candidatos que passam pela etapa vetorial (se ela achar
+    menos que top_k, a busca vetorial completa o resultado). Em todos os
+    casos a `relevancia` é a similaridade de cosseno entre a consulta e o
+    recurso; a pontuação da fusão (RRF ou ponderada) só define a ordem.
+
+    reranquear=True reavalia os melhores candidatos com um cross-encoder
+    (reranqueamento.py), dentro de um orçamento de latência.
+    """
+    if reranquear:
+        reranqueador = obter_reranqueador()
+        candidatos = retrieve(query, max(top_k, reranqueador.n_candidatos), modo, lexico)
+        return reranqueador.reordenar(query, candidatos, top_k)
+    if modo == "local":
+        return retrieveLocal(query, top_k, lexico)
+
+    recursosTodos = []
+    # MeCred, Eduplay e Aquarela são consultadas ao mesmo tempo
+    resultadosFontes = buscar_todas(query)
+    for itens in resultadosFontes.values():
+        recursosTodos.extend(itens)
+    if not recursosTodos:
+        return []
+
+    if lexico:
+        bm25 = IndiceBM25().construir([texto_lexico(dados) for dados in recursosTodos])
+        indicesLexicos, pontuacoesLexicas = bm25.buscar(query, len(recursosTodos))
+        if lexico == "prefiltro" and len(indicesLexicos) >= top_k:
+            # Só os candidatos da BM25 passam pelo modelo
+            candidatos = indicesLexicos[:max(4 * top_k, 20)]
+            recursosTodos = [recursosTodos[indx] for indx in candidatos]
+
+    similaridadesItens = pontuarItens(query, recursosTodos)
+
+    if lexico in ("rrf", "ponderado"):
+        todos = len(recursosTodos)
+        indicesVetoriais, similaridadesVetoriais = selecionar_top_k(similaridadesItens[None, :], todos)[0]
+        indices, _ = fundir(lexico, indicesVetoriais, similaridadesVetoriais,
+                            indicesLexicos, pontuacoesLexicas)
+        # A pontuação da fusão só decide a ordem; a relevância continua sendo o cosseno
+        indices = indices[:top_k]
+        similaridades = similaridadesItens[indices]
+    elif lexico == "prefiltro" and 0 < len(indicesLexicos) < top_k:
+        # Poucos casamentos lexicais: eles vêm primeiro e a busca vetorial completa o top-k
+        posicoes, similaridades = selecionar_top_k(similaridadesItens[indicesLexicos][None, :], top_k)[0]
+        indicesVetoriais, similaridadesVetoriais = selecionar_top_k(similaridadesItens[None, :], 2 * top_k)[0]
+        indices, similaridades = completar_prefiltro(indicesLexicos[posicoes], similaridades,
+                                                     indicesVetoriais, similaridadesVetoriais, top_k)
+    else:
+        indices, similaridades = selecionar_top_k(similaridadesItens[None, :], top_k)[0]
+
+    return [
+        recursosTodos[indx]._replace(relevancia=float(similaridade))
+        for indx, similaridade in zip(indices, similaridades)
+    ]
+
+def retrieveLocal(query:str, top_k:int=5, lexico:str=None):
+    indice = obter_indice_local()
+    # Consultas de usuários simultâneos são codificadas juntas
+    embbendingConsulta = codificarConsulta(query, indice.nome_modelo)
+    if lexico:
+        encontrados = indice.buscar_hibrido(query, embbendingConsulta, top_k, lexico)
+    else:
+        encontrados = indice.buscar(embbendingConsulta, top_k)[0]
+    return [
+        recurso._replace(relevancia=similaridade)
+        for recurso, similaridade in encontrados
+    ]
+
+async def retrieveIncremental(query:str, top_k:int=5, apenasNovos:bool=False):
+    """
+    Versão assíncrona do retrieve() que não espera todas as fontes: cada
+    fonte é pontuada assim que responde e o top-k parcial é atualizado.
+
+    Gera (fonte, resultados), onde resultados é o ranking atual completo
+    ou, com apenasNovos=True, só os itens que entraram no top-k agora.
+    """
+    loop = asyncio.get_running_loop()
+    # A consulta é codificada enquanto as fontes ainda estão respondendo
+    consultaPronta = loop.run_in_executor(None, codificarConsulta, query)
+
+    melhores = []  # heap mínimo de (relevancia, ordem de chegada, resultado)
+    ordemChegada = 0
+    async for fonte, itens in buscar_conforme_chegam(query):
+        if not itens:
+            continue
+        embbendingConsulta = await consultaPronta
+        similaridadesItens = await loop.run_in_executor(None, pontuarItens, query, itens, embbendingConsulta)
+        indices, similaridades = selecionar_top_k(similaridadesItens[None, :], top_k)[0]
+
+        novos = []
+        for indx, similaridade in zip(indices, similaridades):
+            resultado = itens[indx]._replace(relevancia=float(similaridade))
+            entrada = (resultado.relevancia, ordemChegada, resultado)
+            ordemChegada += 1
+            if len(melhores) < top_k:
+                heapq.heappush(melhores, entrada)
+            elif entrada[0] > melhores[0][0]:
+                heapq.heapreplace(melhores, entrada)
+            else:
+                # Os próximos deste lote são ainda menos relevantes
+                break
+            novos.append(resultado)
+
+        if apenasNovos:
+            # Algum novo pode ter sido empurrado para fora pelos seguintes
+            noTopo = {id(entrada[2]) for entrada in melhores}
+            yield fonte, [resultado for resultado in novos if id(resultado) in noTopo]
+        else:
+            yield fonte, [entrada[2] for entrada in sorted(melhores, reverse=True)]
 
 def formatacaotodos(listadados):
-   
-    frasefinal = []
-    for dados in listadados:
-
-        if dados.get('fonte') == 'medcred':
-            usuarioNome = dados.get('user',{}).get('name','Desconhecido')
-            nomematerial = dados.get('name','Sem título')
-            views = dados.get('views',"Não descrito")
-            likes = dados.get('likes',"Não descrito")
-            relevancia = dados.get('relevancia',"Erro")
-            fraseMomentanea = f" Título do material: {nomematerial}, views do material: {views}, likes do material: {likes}, dono do material: {usuarioNome}, relevância em relação ao tema: {relevancia} \n"
-            frasefinal.append(fraseMomentanea)
-        if dados.get('fonte') == 'eduplay': 
-            nomeMaterial = dados.get('name','Sem título')
-            descricao = dados.get('description','Sem descricao')
-            contenttype = dados.get('contentType',"Desconhecido")
-            userOwner = dados.get('userOwner',{}).get('name','Desconhecido')
-            link = dados.get('embedUrl','Não possui')
-            relevancia = dados.get('relevancia',"Erro")
-            fraseMomentanea = f"Título do material: {nomeMaterial}, descrição do material: {descricao},  tipo de material: {contenttype}, dono do material: {userOwner}, link do material: {link},relavância: {relevancia}\n"
-            frasefinal.append(fraseMomentanea)
-    return "\n".join(frasefinal)
-pedido =input()
-
-resultadoRetrieve = retrieve(pedido,5)
-
-print(f"Resultado final: \n {formatacaotodos(resultadoRetrieve)}")
+    """
+    Texto de leitura dos resultados, uma linha por recurso no modelo da sua
+    fonte. Para muitos resultados, prefira formatacao.escrever_texto, que
+    escreve direto num arquivo sem montar a string inteira.
+    """
+    return "\n".join(formatar(recurso) for recurso in listadados)
+
+if __name__ == "__main__":
+    aquecer_modelos()
+    pedido =input()
+
+    resultadoRetrieve = retrieve(pedido,5,os.getenv("REA_MODO","online"),os.getenv("REA_LEXICO") or None,
+                                 os.getenv("REA_RERANQUEAR") == "1")
+
+    print("Resultado final:")
+    escrever_texto(resultadoRetrieve, sys.stdout)
+    caminhoJsonl = os.getenv("REA_SAIDA_JSONL")
+    if caminhoJsonl:
+        with open(caminhoJsonl, "w", encoding="utf-8") as arquivo:
+            escrever_jsonl(resultadoRetrieve, arquivo)
 
 
     
\ No newline at end of file
@@ -0,0 +1,320 @@
+"""
+Benchmark do retrieve()
+=======================
+Mede, sem acesso à internet, quanto cada etapa do `retrieve()` custa:
+rede, preparação dos documentos, codificação, similaridade e formatação.
+
+- As APIs do MeCred e do Eduplay são trocadas por servidores HTTP locais que
+  devolvem as respostas de fixtures/ com latência e jitter configuráveis
+  (via REA_URL_MEDCRED / REA_URL_EDUPLAY).
+- A similaridade e a formatação também são medidas em corpora sintéticos
+  de 10^2 a 10^6 itens (`--tamanhos`).
+- Com `--clientes 1 4 16`, mede a vazão do retrieve() com N clientes
+  simultâneos.
+
+O resultado (p50/p95/p99 de cada etapa, vazão e pico de memória) é salvo em
+JSON; `--comparar` mostra a razão contra um resultado anterior.
+
+Uso:
+    python benchmark.py --saida bench.json
+    python benchmark.py --sem-modelo --tamanhos 100 10000 1000000
+    python benchmark.py --comparar bench_anterior.json
+    python benchmark.py --gravar "saude"       # regrava as fixtures (precisa de rede)
+
+O modelo precisa estar no cache do Hugging Face (rode o Rag.py uma vez com
+rede); o script liga o HF_HUB_OFFLINE. Com `--sem-modelo`, só as etapas
+que não usam o modelo são medidas.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+PASTA_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+# fonte -> (chave da lista, parâmetro com o tamanho da página)
+FIXTURES = {"medcred": ("results", "limit"), "eduplay": ("contents", "quantity")}
+CONSULTAS = ["anatomia", "frações", "programação python", "fotossíntese", "revolução industrial",
+             "libras", "equação do segundo grau", "saúde mental", "ciclo da água", "primeiros socorros"]
+DIMENSAO = 384
+
+
+def percentis(duracoes):
+    """p50/p95/p99 em milissegundos"""
+    ms = np.asarray(duracoes, dtype=np.float64) * 1000
+    if not len(ms):
+        return {"n": 0}
+    return {"n": len(ms), "media_ms": float(ms.mean()),
+            **{f"p{p}_ms": float(np.percentile(ms, p)) for p in (50, 95, 99)}}
+
+
+def rss_pico_mb():
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+# ---------------------------------------------------------------- servidor
+
+def _criar_manipulador(fonte, latencia_ms, jitter_ms):
+    chave, parametro_tamanho = FIXTURES[fonte]
+    with open(os.path.join(PASTA_FIXTURES, f"{fonte}.json"), encoding="utf-8") as arquivo:
+        itens = json.load(arquivo)[chave]
+
+    class Manipulador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # mantém o keep-alive do cliente_http
+
+        def do_GET(self):
+            parametros = parse_qs(urlsplit(self.path).query)
+            tamanho = int(parametros.get(parametro_tamanho, [len(itens)])[0])
+            pagina = int(parametros.get("page", ["1"])[0])
+            # Repete as fixtures até o tamanho pedido, com ids únicos por página
+            resposta = [
+                {**itens[posicao % len(itens)], "id": f"{pagina}-{posicao}"}
+                for posicao in range(tamanho)
+            ]
+            corpo = json.dumps({chave: resposta}, ensure_ascii=False).encode("utf-8")
+            time.sleep(max(random.gauss(latencia_ms, jitter_ms), 0) / 1000)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, *args):
+            pass
+
+    return Manipulador
+
+
+def iniciar_servidores(latencia_ms, jitter_ms):
+    """Um servidor local por fonte; aponta as URLs das fontes para eles"""
+    servidores = []
+    for fonte in FIXTURES:
+        servidor = ThreadingHTTPServer(("127.0.0.1", 0), _criar_manipulador(fonte, latencia_ms, jitter_ms))
+        servidor.daemon_threads = True
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        os.environ[f"REA_URL_{fonte.upper()}"] = f"http://127.0.0.1:{servidor.server_address[1]}/{fonte}"
+        servidores.append(servidor)
+    return servidores
+
+
+def gravar_fixtures(assunto):
+    """Regrava as fixtures com respostas reais das APIs"""
+    from fontes import FONTES
+    for fonte in FIXTURES:
+        busca = FONTES[fonte].buscar
+        resposta = getattr(busca, "__wrapped__", busca)(assunto)
+        with open(os.path.join(PASTA_FIXTURES, f"{fonte}.json"), "w", encoding="utf-8") as arquivo:
+            json.dump(resposta, arquivo, ensure_ascii=False, indent=1)
+        print(f"fixtures/{fonte}.json gravado")
+
+
+# ---------------------------------------------------------------- etapas
+
+def medir_etapas(repeticoes, com_modelo, top_k=5):
+    """Roda o pipeline do retrieve() etapa por etapa, cronometrando cada uma"""
+    from busca_vetorial import normalizar, selecionar_top_k
+    from fontes import buscar_todas
+    from formatacao import escrever_texto
+
+    if com_modelo:
+        from documentos import agregar, preparar_documentos
+        from modelos import MODELO_PADRAO, obter_modelo
+        from Rag import codificarComCache
+        modelo = obter_modelo(MODELO_PADRAO)
+
+    gerador = np.random.default_rng(0)
+    etapas = {nome: [] for nome in ("rede", "preparacao", "codificacao", "similaridade", "formatacao", "total")}
+    saida = open(os.devnull, "w", encoding="utf-8")
+    for repeticao in range(repeticoes):
+        # Consultas sempre novas: nenhuma etapa é servida pelos caches de consulta
+        consulta = f"{CONSULTAS[repeticao % len(CONSULTAS)]} {repeticao}"
+        inicio = time.perf_counter()
+
+        marca = time.perf_counter()
+        itens = [recurso for recursos in buscar_todas(consulta).values() for recurso in recursos]
+        etapas["rede"].append(time.perf_counter() - marca)
+
+        if com_modelo:
+            marca = time.perf_counter()
+            textos, donos = preparar_documentos(itens, modelo)
+            etapas["preparacao"].append(time.perf_counter() - marca)
+
+            marca = time.perf_counter()
+            vetores, vetor_consulta = codificarComCache(textos, [consulta])
+            etapas["codificacao"].append(time.perf_counter() - marca)
+
+            marca = time.perf_counter()
+            similaridades = agregar(normalizar(vetores) @ normalizar(vetor_consulta).ravel(), donos, itens)
+        else:
+            # Sem o modelo, a similaridade usa vetores aleatórios do mesmo tamanho
+            vetores = gerador.standard_normal((len(itens), DIMENSAO), dtype=np.float32)
+            vetor_consulta = gerador.standard_normal(DIMENSAO, dtype=np.float32)
+            marca = time.perf_counter()
+            similaridades = normalizar(vetores) @ normalizar(vetor_consulta)
+        indices, valores = selecionar_top_k(similaridades[None, :], top_k)[0]
+        resultados = [itens[indx]._replace(relevancia=float(valor)) for indx, valor in zip(indices, valores)]
+        etapas["similaridade"].append(time.perf_counter() - marca)
+
+        marca = time.perf_counter()
+        escrever_texto(resultados, saida)
+        etapas["formatacao"].append(time.perf_counter() - marca)
+        etapas["total"].append(time.perf_counter() - inicio)
+    saida.close()
+    return {nome: percentis(duracoes) for nome, duracoes in etapas.items() if duracoes}
+
+
+def _corpus_sintetico(tamanho, gerador):
+    """Vetores normalizados em blocos, para não duplicar a memória em 10^6 itens"""
+    base = np.empty((tamanho, DIMENSAO), dtype=np.float32)
+    for inicio in range(0, tamanho, 100_000):
+        bloco = gerador.standard_normal((min(100_000, tamanho - inicio), DIMENSAO), dtype=np.float32)
+        base[inicio:inicio + len(bloco)] = bloco / np.linalg.norm(bloco, axis=1, keepdims=True)
+    return base
+
+
+def medir_corpora(tamanhos, consultas=20, top_k=10):
+    """Similaridade top-k e formatação em corpora sintéticos de vários tamanhos"""
+    from busca_vetorial import buscar_top_k
+    from fontes import Recurso
+    from formatacao import escrever_jsonl, escrever_texto
+
+    gerador = np.random.default_rng(1)
+    linhas = []
+    for tamanho in tamanhos:
+        base = _corpus_sintetico(tamanho, gerador)
+        vetores_consultas = gerador.standard_normal((consultas, DIMENSAO), dtype=np.float32)
+        duracoes = []
+        for vetor in vetores_consultas:
+            marca = time.perf_counter()
+            buscar_top_k(vetor, base, top_k)
+            duracoes.append(time.perf_counter() - marca)
+        del base
+
+        # A formatação usa no máximo 10^5 recursos: o custo por item já se estabiliza
+        n_recursos = min(tamanho, 100_000)
+        recursos = (Recurso("medcred", i, f"Recurso sintético {i}", "descrição", "Autor", None, None,
+                            i, i // 10, 0.5) for i in range(n_recursos))
+        marca = time.perf_counter()
+        with open(os.devnull, "w", encoding="utf-8") as saida:
+            escrever_texto(recursos, saida)
+        tempo_texto = time.perf_counter() - marca
+        recursos = (Recurso("eduplay", i, f"Recurso sintético {i}", "descrição", "Autor", "VIDEO", "link",
+                            relevancia=0.5) for i in range(n_recursos))
+        marca = time.perf_counter()
+        escrever_jsonl(recursos, io.StringIO())
+        tempo_jsonl = time.perf_counter() - marca
+
+        linhas.append({
+            "tamanho": tamanho,
+            "similaridade": percentis(duracoes),
+            "formatacao_texto_itens_por_s": n_recursos / tempo_texto,
+            "formatacao_jsonl_itens_por_s": n_recursos / tempo_jsonl,
+            "rss_pico_mb": rss_pico_mb(),
+        })
+        print(f"  corpus {tamanho}: p50 {linhas[-1]['similaridade']['p50_ms']:.2f} ms")
+    return linhas
+
+
+def medir_concorrencia(clientes, consultas_por_cliente, top_k=5):
+    """Vazão do retrieve() completo com N clientes ao mesmo tempo"""
+    from Rag import retrieve
+
+    linhas = []
+    for n_clientes in clientes:
+        duracoes = []
+        trava = threading.Lock()
+
+        def cliente(numero):
+            for repeticao in range(consultas_por_cliente):
+                consulta = f"{CONSULTAS[(numero + repeticao) % len(CONSULTAS)]} c{n_clientes}-{numero}-{repeticao}"
+                marca = time.perf_counter()
+                retrieve(consulta, top_k)
+                with trava:
+                    duracoes.append(time.perf_counter() - marca)
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=n_clientes) as executor:
+            list(executor.map(cliente, range(n_clientes)))
+        tempo = time.perf_counter() - inicio
+        linhas.append({"clientes": n_clientes, "consultas_por_s": len(duracoes) / tempo,
+                       "latencia": percentis(duracoes)})
+        print(f"  {n_clientes} clientes: {linhas[-1]['consultas_por_s']:.1f} consultas/s")
+    return linhas
+
+
+def comparar(atual, anterior):
+    """Razão atual/anterior do p50 de cada etapa (> 1 = mais lento)"""
+    for nome, valores in atual["etapas"].items():
+        antes = anterior.get("etapas", {}).get(nome, {}).get("p50_ms")
+        if antes:
+            print(f"  {nome:>13}: {valores['p50_ms']:8.2f} ms  ({valores['p50_ms'] / antes:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark offline do retrieve()")
+    parser.add_argument("--saida", default="bench_resultados.json")
+    parser.add_argument("--repeticoes", type=int, default=50)
+    parser.add_argument("--latencia-ms", type=float, default=80.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--tamanhos", type=int, nargs="*", default=[10**2, 10**3, 10**4, 10**5])
+    parser.add_argument("--clientes", type=int, nargs="*", default=[1, 4, 16])
+    parser.add_argument("--consultas-por-cliente", type=int, default=10)
+    parser.add_argument("--sem-modelo", action="store_true", help="pula codificação e retrieve() completo")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    parser.add_argument("--gravar", metavar="ASSUNTO", help="regrava as fixtures com as APIs reais")
+    args = parser.parse_args()
+
+    if args.gravar is not None:
+        gravar_fixtures(args.gravar)
+        sys.exit()
+
+    # Tudo antes de importar os módulos do retrieve(), que leem o ambiente na carga
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    pasta_temporaria = tempfile.mkdtemp(prefix="bench_rea_")
+    os.environ["REA_CACHE_EMBEDDINGS"] = os.path.join(pasta_temporaria, "cache_embeddings.sqlite")
+    os.environ.pop("REA_CACHE_RESPOSTAS", None)
+    servidores = iniciar_servidores(args.latencia_ms, args.jitter_ms)
+
+    if not args.sem_modelo:
+        from modelos import aquecer_modelos
+        aquecer_modelos()
+
+    resultado = {
+        "ambiente": {"python": platform.python_version(), "plataforma": platform.platform(),
+                     "numpy": np.__version__, "cpus": os.cpu_count()},
+        "parametros": vars(args),
+        "inicio": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    print("Etapas do retrieve()...")
+    resultado["etapas"] = medir_etapas(args.repeticoes, not args.sem_modelo)
+    print("Corpora sintéticos...")
+    resultado["corpora"] = medir_corpora(args.tamanhos)
+    if not args.sem_modelo:
+        print("Clientes simultâneos...")
+        resultado["concorrencia"] = medir_concorrencia(args.clientes, args.consultas_por_cliente)
+    resultado["rss_pico_mb"] = rss_pico_mb()
+
+    for servidor in servidores:
+        servidor.shutdown()
+    with open(args.saida, "w", encoding="utf-8") as arquivo:
+        json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+    print(f"Resultados salvos em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            print("Comparação com", args.comparar)
+            comparar(resultado, json.load(arquivo))
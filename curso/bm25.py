@@ -0,0 +1,225 @@
+"""
+Busca lexical com BM25
+======================
+Índice invertido sobre nome + descrição dos recursos. Acha casamentos
+exatos que a busca por embeddings deixa passar (códigos de disciplina,
+nomes próprios) e não precisa do modelo, então também serve para
+pré-filtrar candidatos antes da etapa vetorial.
+
+A tokenização é própria para português: minúsculas, sem acentos, sem
+palavras vazias ("de", "para", "com"...) e com um radical simples para
+juntar singular e plural. Tokens com dígitos (ex.: "MAT101") ficam intactos.
+
+As listas de cada ranking são combinadas por `fundir_rrf` (Reciprocal
+Rank Fusion) ou `fundir_ponderado` (média ponderada das pontuações).
+
+Como o resto do índice local, cada array vai para um .npy próprio e é aberto
+com `mmap_mode="r"`. Os termos ficam num array ordenado (bytes UTF-8) e são
+achados por busca binária, sem montar um dict do vocabulário na carga.
+"""
+
+import json
+import os
+import re
+
+import numpy as np
+
+from busca_vetorial import selecionar_top_k
+from textos import normalizar_consulta
+
+_PALAVRAS_VAZIAS = """
+a o as os um uma uns umas de do da dos das no na nos nas em por para pra
+com sem sob sobre ao aos à às pelo pela pelos pelas e ou que se como mais
+menos muito muita muitos muitas seu sua seus suas meu minha este esta
+isto esse essa isso aquele aquela entre ate até ja já nao não sim ser
+estar ter foi sao são é eh era qual quais quando onde
+"""
+
+# Sufixos de plural mais comuns -> forma no singular (do mais longo ao mais curto),
+# com o tamanho mínimo do que sobra antes do sufixo. "ões"/"ães" valem mesmo em
+# palavras curtas (ações -> acao, pães -> pao); os outros exigem 3 letras
+# para não trocar palavras curtas como "pais" por "pal"
+SUFIXOS_PLURAL = (("oes", "ao", 1), ("aes", "ao", 1), ("ais", "al", 3), ("eis", "el", 3),
+                  ("ois", "ol", 3), ("ns", "m", 3), ("res", "r", 3), ("zes", "z", 3), ("s", "", 3))
+
+_PADRAO_TOKEN = re.compile(r"\w+")
+# Comparadas já normalizadas, do mesmo jeito que os tokens
+PALAVRAS_VAZIAS = frozenset(normalizar_consulta(_PALAVRAS_VAZIAS).split())
+
+ARQUIVO_PARAMETROS = "bm25.json"
+ARRAYS = ("termos", "inicios", "docs", "frequencias", "idf", "tamanhos")
+
+
+def radical(token):
+    if len(token) <= 3 or any(c.isdigit() for c in token):
+        return token
+    for sufixo, troca, minimo in SUFIXOS_PLURAL:
+        if token.endswith(sufixo) and len(token) - len(sufixo) >= minimo:
+            return token[:-len(sufixo)] + troca
+    return token
+
+
+def tokenizar(texto):
+    return [
+        radical(token)
+        for token in _PADRAO_TOKEN.findall(normalizar_consulta(texto or ""))
+        if token not in PALAVRAS_VAZIAS
+    ]
+
+
+class IndiceBM25:
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.termos = None       # termos em ordem crescente (bytes UTF-8)
+        self.inicios = None      # termo t ocupa docs[inicios[t]:inicios[t+1]]
+        self.docs = None
+        self.frequencias = None
+        self.idf = None
+        self.tamanhos = None
+        self.media_tamanho = 0.0
+
+    def __len__(self):
+        return 0 if self.tamanhos is None else len(self.tamanhos)
+
+    def construir(self, textos):
+        """Monta as listas invertidas (formato CSR) a partir dos textos"""
+        postagens = {}
+        tamanhos = np.zeros(len(textos), dtype=np.float32)
+        for doc, texto in enumerate(textos):
+            tokens = tokenizar(texto)
+            tamanhos[doc] = len(tokens)
+            contagem = {}
+            for token in tokens:
+                contagem[token] = contagem.get(token, 0) + 1
+            for token, frequencia in contagem.items():
+                postagens.setdefault(token, []).append((doc, frequencia))
+
+        # Em ordem, para o termo ser achado por busca binária
+        ordenados = sorted(postagens, key=lambda termo: termo.encode("utf-8"))
+        self.termos = np.array([termo.encode("utf-8") for termo in ordenados], dtype=np.bytes_)
+        listas = [postagens[termo] for termo in ordenados]
+        self.inicios = np.concatenate([[0], np.cumsum([len(lista) for lista in listas])]).astype(np.int64)
+        self.docs = np.array([doc for lista in listas for doc, _ in lista], dtype=np.int32)
+        self.frequencias = np.array([freq for lista in listas for _, freq in lista], dtype=np.float32)
+        self.tamanhos = tamanhos
+        self.media_tamanho = float(tamanhos.mean()) if len(tamanhos) else 0.0
+        total = len(textos)
+        n_docs_termo = np.diff(self.inicios)
+        self.idf = np.log(1 + (total - n_docs_termo + 0.5) / (n_docs_termo + 0.5)).astype(np.float32)
+        return self
+
+    def posicao_termo(self, termo):
+        """Posição do termo em `termos` (None se não estiver no vocabulário)"""
+        chave = termo.encode("utf-8")
+        t = int(np.searchsorted(self.termos, chave))
+        if t < len(self.termos) and self.termos[t] == chave:
+            return t
+        return None
+
+    def pontuar(self, consulta):
+        """Pontuação BM25 de todos os documentos (zero para quem não tem nenhum termo)"""
+        pontuacoes = np.zeros(len(self), dtype=np.float32)
+        normalizacao = self.k1 * (1 - self.b + self.b * self.tamanhos / max(self.media_tamanho, 1e-9))
+        for termo in set(tokenizar(consulta)):
+            t = self.posicao_termo(termo)
+            if t is None:
+                continue
+            docs = self.docs[self.inicios[t]:self.inicios[t + 1]]
+            freq = self.frequencias[self.inicios[t]:self.inicios[t + 1]]
+            pontuacoes[docs] += self.idf[t] * freq * (self.k1 + 1) / (freq + normalizacao[docs])
+        return pontuacoes
+
+    def buscar(self, consulta, k=10):
+        """(indices, pontuacoes) dos k melhores documentos com pontuação > 0"""
+        pontuacoes = self.pontuar(consulta)
+        indices, valores = selecionar_top_k(pontuacoes[None, :], k)[0]
+        positivos = valores > 0
+        return indices[positivos], valores[positivos]
+
+    def salvar(self, pasta):
+        os.makedirs(pasta, exist_ok=True)
+        for nome in ARRAYS:
+            np.save(os.path.join(pasta, f"bm25_{nome}.npy"), getattr(self, nome))
+        with open(os.path.join(pasta, ARQUIVO_PARAMETROS), "w", encoding="utf-8") as arquivo:
+            json.dump({"k1": self.k1, "b": self.b, "media_tamanho": self.media_tamanho}, arquivo)
+
+    @classmethod
+    def carregar(cls, pasta):
+        with open(os.path.join(pasta, ARQUIVO_PARAMETROS), encoding="utf-8") as arquivo:
+            dados = json.load(arquivo)
+        indice = cls(dados["k1"], dados["b"])
+        indice.media_tamanho = dados["media_tamanho"]
+        # Mapeados do disco, como os vetores: nada é copiado para a memória na carga
+        for nome in ARRAYS:
+            setattr(indice, nome, np.load(os.path.join(pasta, f"bm25_{nome}.npy"), mmap_mode="r"))
+        return indice
+
+    @staticmethod
+    def existe(pasta):
+        return os.path.exists(os.path.join(pasta, ARQUIVO_PARAMETROS))
+
+
+def fundir_rrf(rankings, k=60, pesos=None):
+    """
+    Reciprocal Rank Fusion: cada lista (índices do melhor para o pior) soma
+    peso / (k + posição) para cada documento. Devolve (indices, pontuacoes)
+    em ordem decrescente.
+    """
+    pesos = pesos or [1.0] * len(rankings)
+    pontuacoes = {}
+    for ranking, peso in zip(rankings, pesos):
+        for posicao, doc in enumerate(ranking, 1):
+            pontuacoes[int(doc)] = pontuacoes.get(int(doc), 0.0) + peso / (k + posicao)
+    ordenados = sorted(pontuacoes.items(), key=lambda par: par[1], reverse=True)
+    return (np.array([doc for doc, _ in ordenados], dtype=np.int64),
+            np.array([pontuacao for _, pontuacao in ordenados], dtype=np.float32))
+
+
+def _min_max(valores):
+    valores = np.asarray(valores, dtype=np.float32)
+    if not len(valores):
+        return valores
+    amplitude = valores.max() - valores.min()
+    return (valores - valores.min()) / amplitude if amplitude > 0 else np.ones_like(valores)
+
+
+def fundir_ponderado(indices_vetoriais, pontuacoes_vetoriais, indices_lexicos,
+                     pontuacoes_lexicas, peso_lexico=0.3):
+    """Média ponderada das pontuações (cada uma normalizada para 0..1)"""
+    combinadas = {}
+    for doc, valor in zip(indices_vetoriais, _min_max(pontuacoes_vetoriais)):
+        combinadas[int(doc)] = (1 - peso_lexico) * valor
+    for doc, valor in zip(indices_lexicos, _min_max(pontuacoes_lexicas)):
+        combinadas[int(doc)] = combinadas.get(int(doc), 0.0) + peso_lexico * valor
+    ordenados = sorted(combinadas.items(), key=lambda par: par[1], reverse=True)
+    return (np.array([doc for doc, _ in ordenados], dtype=np.int64),
+            np.array([pontuacao for _, pontuacao in ordenados], dtype=np.float32))
+
+
+ESTRATEGIAS = ("rrf", "ponderado", "prefiltro")
+
+
+def completar_prefiltro(indices, similaridades, indices_vetoriais, similaridades_vetoriais, k):
+    """
+    O pré-filtro só devolve documentos que a BM25 achou; quando eles não
+    chegam a k, as vagas que sobram vão para os melhores da busca vetorial
+    que ainda não estão na lista.
+    """
+    indices_vetoriais = np.asarray(indices_vetoriais)
+    novos = ~np.isin(indices_vetoriais, indices)
+    faltam = max(k - len(indices), 0)
+    return (np.concatenate([indices, indices_vetoriais[novos][:faltam]]).astype(np.int64),
+            np.concatenate([similaridades, np.asarray(similaridades_vetoriais)[novos][:faltam]]))
+
+
+def fundir(estrategia, indices_vetoriais, pontuacoes_vetoriais, indices_lexicos, pontuacoes_lexicas):
+    """Combina os dois rankings com a estratégia escolhida ("ponderado" ou RRF)"""
+    if estrategia == "ponderado":
+        return fundir_ponderado(indices_vetoriais, pontuacoes_vetoriais, indices_lexicos, pontuacoes_lexicas)
+    return fundir_rrf([indices_vetoriais, indices_lexicos])
+
+
+def texto_lexico(recurso):
+    """Campos usados no índice lexical: nome + descrição"""
+    return f"{recurso.nome} {recurso.descricao}"
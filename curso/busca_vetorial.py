@@ -0,0 +1,55 @@
+"""
+Busca top-k por similaridade de cosseno
+=======================================
+Com os vetores já normalizados (norma 1), o cosseno vira um produto
+escalar: basta uma multiplicação de matrizes para pontuar toda a base.
+Em vez de ordenar todas as similaridades, `np.argpartition` separa só os
+k melhores em O(n) e apenas esses k são ordenados.
+"""
+
+import numpy as np
+
+
+def normalizar(embeddings):
+    """Devolve uma cópia float32 com cada linha de norma 1 (linhas nulas ficam nulas)"""
+    matriz = np.asarray(embeddings, dtype=np.float32)
+    normas = np.linalg.norm(matriz, axis=-1, keepdims=True)
+    normas[normas == 0] = 1.0
+    return matriz / normas
+
+
+def buscar_top_k(consultas, base_normalizada, k=5, similaridade_minima=None):
+    """
+    Busca os k vetores mais parecidos com cada consulta.
+
+    `consultas` pode ser um vetor ou uma matriz (uma consulta por linha);
+    `base_normalizada` deve ter passado por `normalizar`. Devolve uma lista
+    com um par (indices, similaridades) por consulta, do mais para o menos
+    similar, já sem os itens abaixo de `similaridade_minima`.
+    """
+    matriz_consultas = normalizar(np.atleast_2d(consultas))
+    return selecionar_top_k(matriz_consultas @ base_normalizada.T, k, similaridade_minima)
+
+
+def selecionar_top_k(similaridades, k=5, similaridade_minima=None):
+    """Top-k de cada linha de uma matriz (consultas x base) de similaridades já calculada"""
+    total = similaridades.shape[1]
+    k = min(k, total)
+    if k <= 0:
+        vazio = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+        return [vazio for _ in range(similaridades.shape[0])]
+
+    if k < total:
+        candidatos = np.argpartition(-similaridades, k - 1, axis=1)[:, :k]
+    else:
+        candidatos = np.broadcast_to(np.arange(total), similaridades.shape)
+    pontuacoes = np.take_along_axis(similaridades, candidatos, axis=1)
+
+    ordem = np.argsort(-pontuacoes, axis=1)
+    indices = np.take_along_axis(candidatos, ordem, axis=1)
+    pontuacoes = np.take_along_axis(pontuacoes, ordem, axis=1)
+
+    if similaridade_minima is None:
+        return list(zip(indices, pontuacoes))
+    mascara = pontuacoes >= similaridade_minima
+    return [(indices[i][mascara[i]], pontuacoes[i][mascara[i]]) for i in range(len(indices))]
@@ -0,0 +1,93 @@
+"""
+Classificador leve sobre embeddings congelados
+==============================================
+Alternativa ao fine-tuning do DistilBERT inteiro: o encoder usado no resto
+do projeto (paraphrase-multilingual-MiniLM-L12-v2) fica congelado, os
+embeddings dos textos vão para o cache em disco (cache_embeddings.py) e só
+uma cabeça pequena é treinada em cima deles:
+
+- "logistica": regressão logística
+- "mlp":       uma camada oculta (MLPClassifier)
+
+Treinar leva segundos e, na inferência, o custo é praticamente só o encode
+do MiniLM. A interface de previsão é a mesma do ClassificadorSLM
+(`classificar(textos) -> (rotulos, confiancas)`, com os nomes das classes).
+"""
+
+import time
+from itertools import islice
+
+import joblib
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.neural_network import MLPClassifier
+
+from busca_vetorial import normalizar
+from cache_embeddings import obter_cache
+from modelos import MODELO_PADRAO, obter_modelo
+
+CABECAS = {
+    "logistica": lambda: LogisticRegression(max_iter=1000, C=10.0),
+    "mlp": lambda: MLPClassifier(hidden_layer_sizes=(128,), max_iter=500, early_stopping=False,
+                                 random_state=0),
+}
+
+
+class ClassificadorEmbeddings:
+    def __init__(self, nomes, cabeca="logistica", nome_modelo=MODELO_PADRAO, batch_size=64):
+        self.nomes_classes = dict(nomes)
+        self.cabeca = CABECAS[cabeca]()
+        self.tipo_cabeca = cabeca
+        self.nome_modelo = nome_modelo
+        self.batch_size = batch_size
+        self.tempos = {}
+
+    def _embeddings(self, textos):
+        modelo = obter_modelo(self.nome_modelo)
+        return normalizar(obter_cache().codificar(modelo, self.nome_modelo, list(textos), self.batch_size))
+
+    def treinar(self, textos, rotulos):
+        """Treina só a cabeça; guarda em `tempos` quanto levou o encode e o ajuste"""
+        inicio = time.perf_counter()
+        vetores = self._embeddings(textos)
+        self.tempos["embeddings_s"] = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        self.cabeca.fit(vetores, np.asarray(rotulos))
+        self.tempos["ajuste_s"] = time.perf_counter() - inicio
+        # Nomes na ordem das colunas do predict_proba
+        self.nomes = np.array([self.nomes_classes[int(classe)] for classe in self.cabeca.classes_], dtype=object)
+        return self
+
+    def classificar_em_blocos(self, textos, tamanho_bloco=1024):
+        """Gera (textos, rotulos, confiancas) por bloco, como o ClassificadorSLM"""
+        iterador = iter(textos)
+        while True:
+            bloco = list(islice(iterador, tamanho_bloco))
+            if not bloco:
+                return
+            probabilidades = self.cabeca.predict_proba(self._embeddings(bloco))
+            indices = probabilidades.argmax(axis=1)
+            yield bloco, self.nomes[indices], probabilidades[np.arange(len(bloco)), indices].astype(np.float32)
+
+    def classificar(self, textos):
+        """(rotulos, confiancas) como arrays, um por texto"""
+        rotulos, confiancas = [], []
+        for _, rotulos_bloco, confiancas_bloco in self.classificar_em_blocos(textos):
+            rotulos.append(rotulos_bloco)
+            confiancas.append(confiancas_bloco)
+        if not rotulos:
+            return np.empty(0, dtype=object), np.empty(0, dtype=np.float32)
+        return np.concatenate(rotulos), np.concatenate(confiancas)
+
+    def salvar(self, caminho):
+        joblib.dump({"cabeca": self.cabeca, "tipo_cabeca": self.tipo_cabeca, "nomes": self.nomes_classes,
+                     "nome_modelo": self.nome_modelo}, caminho)
+
+    @classmethod
+    def carregar(cls, caminho):
+        dados = joblib.load(caminho)
+        classificador = cls(dados["nomes"], dados["tipo_cabeca"], dados["nome_modelo"])
+        classificador.cabeca = dados["cabeca"]
+        classificador.nomes = np.array([classificador.nomes_classes[int(classe)]
+                                        for classe in classificador.cabeca.classes_], dtype=object)
+        return classificador
@@ -0,0 +1,80 @@
+"""
+Cache dos embeddings das consultas
+==================================
+Muitas consultas se repetem, às vezes só mudando maiúsculas, acentos ou
+espaços ("Saúde  ambiental" e "saude ambiental"). A chave é a consulta
+normalizada; um acerto evita o forward pass do modelo.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from modelos import MODELO_PADRAO
+from textos import normalizar_consulta
+
+MAX_ITENS_PADRAO = int(os.getenv("REA_CACHE_CONSULTAS_MAX", "10000"))
+TTL_PADRAO = float(os.getenv("REA_CACHE_CONSULTAS_TTL", "86400"))
+
+
+class CacheConsultas:
+    def __init__(self, max_itens=MAX_ITENS_PADRAO, ttl=TTL_PADRAO):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, consulta):
+        """Vetor da consulta, ou None se não estiver no cache (ou tiver expirado)"""
+        chave = normalizar_consulta(consulta)
+        with self._trava:
+            entrada = self._itens.get(chave)
+            if entrada is not None and time.monotonic() - entrada[1] < self.ttl:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return entrada[0]
+            if entrada is not None:
+                del self._itens[chave]
+            self.falhas += 1
+            return None
+
+    def guardar(self, consulta, vetor):
+        chave = normalizar_consulta(consulta)
+        with self._trava:
+            self._itens[chave] = (vetor, time.monotonic())
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def codificar(self, consulta, codificar):
+        """Devolve o vetor em cache ou calcula com `codificar(consulta)` e guarda"""
+        vetor = self.obter(consulta)
+        if vetor is None:
+            vetor = codificar(consulta)
+            self.guardar(consulta, vetor)
+        return vetor
+
+    def estatisticas(self):
+        with self._trava:
+            total = self.acertos + self.falhas
+            return {
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": self.acertos / total if total else 0.0,
+                "itens": len(self._itens),
+            }
+
+
+_caches = {}
+_trava_caches = threading.Lock()
+
+
+def obter_cache_consultas(nome_modelo=MODELO_PADRAO):
+    """Um cache por modelo: o mesmo texto tem vetores diferentes em cada um"""
+    with _trava_caches:
+        if nome_modelo not in _caches:
+            _caches[nome_modelo] = CacheConsultas()
+        return _caches[nome_modelo]
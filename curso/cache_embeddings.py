@@ -0,0 +1,160 @@
+"""
+Cache de embeddings em disco
+============================
+Guarda os vetores (float32) dos títulos de REA num SQLite, indexados pelo
+hash de (nome do modelo, texto normalizado). Só os textos que ainda não
+estão no cache vão para o modelo. Quando o cache passa de `max_itens`, os
+vetores usados há mais tempo são descartados (LRU).
+
+As leituras não escrevem no SQLite: o último uso de cada chave fica em
+memória e vai para o disco junto com a próxima gravação ou a cada
+`INTERVALO_USO` segundos.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from codificador import BATCH_SIZE_PADRAO, codificar_lote
+
+CAMINHO_PADRAO = os.getenv("REA_CACHE_EMBEDDINGS", "cache_embeddings.sqlite")
+MAX_ITENS_PADRAO = 200_000
+INTERVALO_USO = 60.0
+
+
+def normalizar_texto(texto):
+    """Remove espaços repetidos e nas pontas"""
+    return " ".join((texto or "").split())
+
+
+def chave_texto(nome_modelo, texto):
+    conteudo = f"{nome_modelo}\0{normalizar_texto(texto)}".encode("utf-8")
+    return hashlib.sha1(conteudo).hexdigest()
+
+
+def completar(vetores, novos):
+    """Preenche, na ordem, as posições None de `vetores` com as linhas de `novos`"""
+    proximo = iter(novos)
+    for i, vetor in enumerate(vetores):
+        if vetor is None:
+            vetores[i] = next(proximo)
+    return vetores
+
+
+class CacheEmbeddings:
+    def __init__(self, caminho=CAMINHO_PADRAO, max_itens=MAX_ITENS_PADRAO, intervalo_uso=INTERVALO_USO):
+        self.max_itens = max_itens
+        self.intervalo_uso = intervalo_uso
+        self._trava = threading.Lock()
+        # chave -> último uso ainda não gravado no disco
+        self._usos = {}
+        self._ultima_gravacao_usos = time.monotonic()
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False)
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " chave TEXT PRIMARY KEY,"
+            " vetor BLOB NOT NULL,"
+            " ultimo_uso REAL NOT NULL)"
+        )
+        self._conexao.execute(
+            "CREATE INDEX IF NOT EXISTS idx_ultimo_uso ON embeddings (ultimo_uso)"
+        )
+        self._conexao.commit()
+
+    def consultar(self, nome_modelo, textos):
+        """Vetores já guardados, na ordem de `textos` (None onde ainda não há)"""
+        chaves = [chave_texto(nome_modelo, texto) for texto in textos]
+        encontrados = self._ler(set(chaves))
+        return [encontrados.get(chave) for chave in chaves]
+
+    def guardar(self, nome_modelo, textos, vetores):
+        vetores = np.asarray(vetores, dtype=np.float32)
+        self._gravar(
+            (chave_texto(nome_modelo, texto), vetor) for texto, vetor in zip(textos, vetores)
+        )
+
+    def codificar(self, modelo, nome_modelo, textos, batch_size=BATCH_SIZE_PADRAO):
+        """Igual a modelo.encode(textos), mas só codifica o que falta no cache"""
+        vetores = self.consultar(nome_modelo, textos)
+        faltando = [texto for texto, vetor in zip(textos, vetores) if vetor is None]
+        if faltando:
+            novos = codificar_lote(modelo, faltando, batch_size=batch_size)
+            self.guardar(nome_modelo, faltando, novos)
+            completar(vetores, novos)
+        if not textos:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack(vetores)
+
+    def __len__(self):
+        with self._trava:
+            return self._conexao.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _ler(self, chaves):
+        if not chaves:
+            return {}
+        agora = time.time()
+        lista = list(chaves)
+        encontrados = {}
+        with self._trava:
+            # O SQLite limita a quantidade de parâmetros por consulta
+            for inicio in range(0, len(lista), 500):
+                parte = lista[inicio:inicio + 500]
+                marcadores = ",".join("?" * len(parte))
+                linhas = self._conexao.execute(
+                    f"SELECT chave, vetor FROM embeddings WHERE chave IN ({marcadores})",
+                    parte,
+                ).fetchall()
+                for chave, vetor in linhas:
+                    encontrados[chave] = np.frombuffer(vetor, dtype=np.float32)
+            self._usos.update(dict.fromkeys(encontrados, agora))
+            if time.monotonic() - self._ultima_gravacao_usos >= self.intervalo_uso:
+                self._gravar_usos()
+                self._conexao.commit()
+        return encontrados
+
+    def _gravar_usos(self):
+        """Leva os últimos usos guardados em memória para o SQLite (com a trava já obtida)"""
+        if self._usos:
+            self._conexao.executemany(
+                "UPDATE embeddings SET ultimo_uso = ? WHERE chave = ?",
+                [(ultimo_uso, chave) for chave, ultimo_uso in self._usos.items()],
+            )
+            self._usos.clear()
+        self._ultima_gravacao_usos = time.monotonic()
+
+    def _gravar(self, pares):
+        agora = time.time()
+        with self._trava:
+            # Os usos pendentes entram antes do descarte, para o LRU ver a ordem certa
+            self._gravar_usos()
+            self._conexao.executemany(
+                "INSERT OR REPLACE INTO embeddings (chave, vetor, ultimo_uso) VALUES (?, ?, ?)",
+                [(chave, vetor.tobytes(), agora) for chave, vetor in pares],
+            )
+            excesso = self._conexao.execute(
+                "SELECT COUNT(*) FROM embeddings"
+            ).fetchone()[0] - self.max_itens
+            if excesso > 0:
+                self._conexao.execute(
+                    "DELETE FROM embeddings WHERE chave IN ("
+                    " SELECT chave FROM embeddings ORDER BY ultimo_uso LIMIT ?)",
+                    (excesso,),
+                )
+            self._conexao.commit()
+
+
+_cache = None
+_trava_cache = threading.Lock()
+
+
+def obter_cache():
+    """Instância compartilhada do cache, aberta no primeiro uso"""
+    global _cache
+    with _trava_cache:
+        if _cache is None:
+            _cache = CacheEmbeddings()
+    return _cache
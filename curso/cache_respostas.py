@@ -0,0 +1,217 @@
+"""
+Cache das respostas das APIs de REA
+===================================
+Guarda o resultado das buscas por (fonte, consulta normalizada, parâmetros)
+em memória (LRU) e, opcionalmente, num SQLite que sobrevive a reinícios.
+
+Depois do `ttl`, a resposta ainda é servida na hora por mais `janela_obsoleto`
+segundos enquanto uma atualização roda em segundo plano
+(stale-while-revalidate). Depois disso a busca volta a ser síncrona.
+
+Só uma busca por chave roda de cada vez: quem pede a mesma chave enquanto
+ela está sendo carregada espera o resultado dessa busca em vez de disparar
+outra. No SQLite, as respostas vencidas são apagadas a cada gravação e o
+total de linhas fica limitado a `max_itens_disco`.
+"""
+
+import functools
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+TTL_PADRAO = 600
+JANELA_OBSOLETO_PADRAO = 3600
+MAX_ITENS_PADRAO = 1024
+MAX_ITENS_DISCO_PADRAO = 50_000
+
+
+def normalizar_consulta(consulta):
+    return " ".join(str(consulta).casefold().split())
+
+
+class CacheRespostas:
+    def __init__(self, ttl=TTL_PADRAO, janela_obsoleto=JANELA_OBSOLETO_PADRAO,
+                 max_itens=MAX_ITENS_PADRAO, caminho_disco=None, max_itens_disco=MAX_ITENS_DISCO_PADRAO):
+        self.ttl = ttl
+        self.janela_obsoleto = janela_obsoleto
+        self.max_itens = max_itens
+        self.max_itens_disco = max_itens_disco
+        self._memoria = OrderedDict()
+        self._trava = threading.Lock()
+        # chave -> Future da busca em andamento (na hora ou em segundo plano)
+        self._atualizando = {}
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-respostas")
+        self.contadores = {"acertos": 0, "obsoletos": 0, "falhas": 0, "compartilhadas": 0,
+                           "atualizacoes": 0, "erros": 0}
+
+        self._disco = None
+        if caminho_disco:
+            self._disco = sqlite3.connect(caminho_disco, check_same_thread=False)
+            self._disco.execute(
+                "CREATE TABLE IF NOT EXISTS respostas ("
+                " chave TEXT PRIMARY KEY, valor TEXT NOT NULL, criado_em REAL NOT NULL)"
+            )
+            self._disco.execute(
+                "CREATE INDEX IF NOT EXISTS idx_criado_em ON respostas (criado_em)"
+            )
+            self._disco.commit()
+
+    def obter(self, chave, carregar):
+        """Devolve o valor em cache para `chave` ou chama `carregar()` para obtê-lo"""
+        entrada = self._ler(chave)
+        if entrada is not None:
+            valor, criado_em = entrada
+            idade = time.time() - criado_em
+            if idade < self.ttl:
+                self._contar("acertos")
+                return valor
+            if idade < self.ttl + self.janela_obsoleto:
+                self._contar("obsoletos")
+                self._atualizar_em_segundo_plano(chave, carregar)
+                return valor
+
+        self._contar("falhas")
+        futuro, dono = self._reservar(chave)
+        if not dono:
+            # Outra thread já está buscando esta chave
+            self._contar("compartilhadas")
+            return futuro.result()
+        return self._carregar(chave, futuro, carregar)
+
+    def estatisticas(self):
+        with self._trava:
+            estatisticas = dict(self.contadores)
+            estatisticas["itens_memoria"] = len(self._memoria)
+        consultas = estatisticas["acertos"] + estatisticas["obsoletos"] + estatisticas["falhas"]
+        estatisticas["taxa_acerto"] = (
+            (estatisticas["acertos"] + estatisticas["obsoletos"]) / consultas if consultas else 0.0
+        )
+        return estatisticas
+
+    def limpar(self):
+        with self._trava:
+            self._memoria.clear()
+            if self._disco is not None:
+                self._disco.execute("DELETE FROM respostas")
+                self._disco.commit()
+
+    def _contar(self, nome):
+        with self._trava:
+            self.contadores[nome] += 1
+
+    def _ler(self, chave):
+        with self._trava:
+            if chave in self._memoria:
+                self._memoria.move_to_end(chave)
+                return self._memoria[chave]
+            if self._disco is None:
+                return None
+            linha = self._disco.execute(
+                "SELECT valor, criado_em FROM respostas WHERE chave = ?", (chave,)
+            ).fetchone()
+        if linha is None:
+            return None
+        entrada = (json.loads(linha[0]), linha[1])
+        self._guardar_na_memoria(chave, entrada)
+        return entrada
+
+    def _gravar(self, chave, valor):
+        entrada = (valor, time.time())
+        self._guardar_na_memoria(chave, entrada)
+        if self._disco is not None:
+            with self._trava:
+                self._disco.execute(
+                    "INSERT OR REPLACE INTO respostas (chave, valor, criado_em) VALUES (?, ?, ?)",
+                    (chave, json.dumps(valor), entrada[1]),
+                )
+                # Vencidas não seriam mais servidas nem como obsoletas
+                self._disco.execute(
+                    "DELETE FROM respostas WHERE criado_em < ?",
+                    (entrada[1] - self.ttl - self.janela_obsoleto,),
+                )
+                excesso = self._disco.execute(
+                    "SELECT COUNT(*) FROM respostas"
+                ).fetchone()[0] - self.max_itens_disco
+                if excesso > 0:
+                    self._disco.execute(
+                        "DELETE FROM respostas WHERE chave IN ("
+                        " SELECT chave FROM respostas ORDER BY criado_em LIMIT ?)",
+                        (excesso,),
+                    )
+                self._disco.commit()
+
+    def _guardar_na_memoria(self, chave, entrada):
+        with self._trava:
+            self._memoria[chave] = entrada
+            self._memoria.move_to_end(chave)
+            while len(self._memoria) > self.max_itens:
+                self._memoria.popitem(last=False)
+
+    def _reservar(self, chave):
+        """(Future da busca da chave, True se quem chamou ficou responsável por ela)"""
+        with self._trava:
+            if chave in self._atualizando:
+                return self._atualizando[chave], False
+            futuro = self._atualizando[chave] = Future()
+            return futuro, True
+
+    def _carregar(self, chave, futuro, carregar):
+        """Roda a busca reservada, grava e entrega o resultado a quem estiver esperando"""
+        try:
+            valor = carregar()
+            self._gravar(chave, valor)
+        except BaseException as erro:
+            futuro.set_exception(erro)
+            raise
+        finally:
+            with self._trava:
+                self._atualizando.pop(chave, None)
+        futuro.set_result(valor)
+        return valor
+
+    def _atualizar_em_segundo_plano(self, chave, carregar):
+        # Uma única atualização por chave, mesmo com vários pedidos ao mesmo tempo
+        futuro, dono = self._reservar(chave)
+        if not dono:
+            return
+
+        def atualizar():
+            try:
+                self._carregar(chave, futuro, carregar)
+                self._contar("atualizacoes")
+            except Exception:
+                # Mantém a resposta antiga; a próxima leitura tenta de novo
+                self._contar("erros")
+
+        self._executor.submit(atualizar)
+
+
+cache_padrao = CacheRespostas(caminho_disco=os.getenv("REA_CACHE_RESPOSTAS"))
+
+
+def em_cache(fonte, cache=None):
+    """
+    Decorador para funções de busca `f(assunto, **parametros)`.
+
+    A chave é (fonte, assunto normalizado, demais parâmetros já com os
+    valores padrão), então chamadas equivalentes compartilham a resposta.
+    """
+    def decorador(funcao):
+        assinatura = inspect.signature(funcao)
+
+        @functools.wraps(funcao)
+        def com_cache(*args, **kwargs):
+            argumentos = assinatura.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            valores = list(argumentos.arguments.items())
+            assunto = valores[0][1]
+            chave = json.dumps([fonte, normalizar_consulta(assunto), valores[1:]])
+            return (cache or cache_padrao).obter(chave, lambda: funcao(*args, **kwargs))
+
+        return com_cache
+    return decorador
@@ -0,0 +1,108 @@
+"""
+Cache de dados já tokenizados
+=============================
+Os dados de treino dos SLMs ficam em arquivos (CSV ou JSONL, lidos linha a
+linha) e são tokenizados uma vez só. O resultado é gravado em Arrow
+(`Dataset.save_to_disk`) numa pasta por tokenizer + max_length + modo de
+padding; nas próximas execuções o `load_from_disk` abre o arquivo mapeado
+em memória, sem copiar nem tokenizar de novo.
+
+Cada linha guarda o hash do seu conteúdo (texto + rótulo). Quando o arquivo
+de dados cresce ou muda, só as linhas com hash novo passam pelo tokenizer;
+as demais são reaproveitadas do cache e as que sumiram do arquivo saem.
+"""
+
+import csv
+import hashlib
+import json
+import os
+import shutil
+
+from datasets import Dataset, concatenate_datasets, load_from_disk
+
+from treino_slm import MODO_PADDING, funcao_tokenizar
+
+PASTA_CACHE = os.getenv("SLM_CACHE_TOKENS", "cache_tokens")
+COLUNA_HASH = "hash_linha"
+
+
+def ler_linhas(caminho):
+    """Gera um dict por linha de um .csv ou .jsonl, sem carregar o arquivo todo"""
+    with open(caminho, encoding="utf-8", newline="") as arquivo:
+        if caminho.endswith(".csv"):
+            yield from csv.DictReader(arquivo)
+        else:
+            for linha in arquivo:
+                if linha.strip():
+                    yield json.loads(linha)
+
+
+def gravar_linhas(caminho, dados, colunas):
+    """Grava um dict de colunas (como o do Dataset.from_dict) em JSONL"""
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        for valores in zip(*(dados[coluna] for coluna in colunas)):
+            arquivo.write(json.dumps(dict(zip(colunas, valores)), ensure_ascii=False) + "\n")
+
+
+def identificar_tokenizer(tokenizer):
+    """Hash do vocabulário e das regras do tokenizer (não do caminho de onde veio)"""
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    conteudo = backend.to_str() if backend is not None else f"{tokenizer.name_or_path}:{len(tokenizer)}"
+    return hashlib.sha1(conteudo.encode("utf-8")).hexdigest()[:16]
+
+
+def _hash_linha(texto, rotulo):
+    return hashlib.sha1(f"{rotulo}\t{texto}".encode("utf-8")).hexdigest()
+
+
+def carregar_tokenizado(caminho_dados, tokenizer, max_length, coluna_texto="texto", coluna_rotulo="categoria",
+                        pasta_cache=PASTA_CACHE, modo=MODO_PADDING):
+    """
+    Dataset com input_ids, attention_mask e labels para o Trainer.
+    Devolve (dataset, quantidade de linhas tokenizadas agora).
+    """
+    chave = f"{identificar_tokenizer(tokenizer)}_{max_length}_{modo}"
+    pasta = os.path.join(pasta_cache, chave)
+    cache = load_from_disk(pasta) if os.path.exists(pasta) else None
+    posicoes = {} if cache is None else {valor: i for i, valor in enumerate(cache[COLUNA_HASH])}
+
+    reaproveitadas = []
+    novas = {coluna_texto: [], "labels": [], COLUNA_HASH: []}
+    vistas = set()
+    for linha in ler_linhas(caminho_dados):
+        texto, rotulo = linha[coluna_texto], int(linha[coluna_rotulo])
+        valor = _hash_linha(texto, rotulo)
+        # Linhas repetidas no arquivo entram uma vez só
+        if valor in vistas:
+            continue
+        vistas.add(valor)
+        if valor in posicoes:
+            reaproveitadas.append(posicoes[valor])
+        else:
+            novas[coluna_texto].append(texto)
+            novas["labels"].append(rotulo)
+            novas[COLUNA_HASH].append(valor)
+
+    total_novas = len(novas[COLUNA_HASH])
+    sem_mudanca = cache is not None and total_novas == 0 and len(reaproveitadas) == len(cache)
+    if sem_mudanca:
+        return cache, 0
+
+    if not vistas:
+        raise ValueError(f"Nenhuma linha de treino em {caminho_dados}")
+    partes = []
+    if reaproveitadas:
+        partes.append(cache.select(reaproveitadas))
+    if total_novas:
+        tokenizar = funcao_tokenizar(tokenizer, coluna_texto, max_length, modo)
+        partes.append(Dataset.from_dict(novas).map(tokenizar, batched=True, remove_columns=[coluna_texto]))
+    dataset = concatenate_datasets(partes) if len(partes) > 1 else partes[0]
+
+    # Grava numa pasta nova e troca: a antiga pode estar mapeada em memória
+    temporaria = pasta + ".novo"
+    shutil.rmtree(temporaria, ignore_errors=True)
+    dataset.save_to_disk(temporaria)
+    del cache, dataset
+    shutil.rmtree(pasta, ignore_errors=True)
+    os.replace(temporaria, pasta)
+    return load_from_disk(pasta), total_novas
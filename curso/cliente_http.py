@@ -0,0 +1,124 @@
+"""
+Cliente HTTP compartilhado pelas fontes de REA
+==============================================
+Uma única requests.Session com pool de conexões (keep-alive), timeouts
+padrão, novas tentativas com backoff em erros 5xx/429 e um limite de
+requisições simultâneas por host.
+
+Cada chamada tem um prazo total (`prazo`, em segundos): o timeout de cada
+tentativa é cortado pelo tempo que resta e não há nova tentativa (nem
+backoff) depois que o prazo acaba. Quem dispara a busca numa thread pode
+impor um limite a todas as chamadas dela com `com_prazo` (ex.: o prazo da
+fonte em fontes.py), sem mudar a assinatura das funções de busca.
+"""
+
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+TAMANHO_POOL = int(os.getenv("REA_HTTP_POOL", "16"))
+TIMEOUT_CONEXAO = 3.05
+TIMEOUT_LEITURA = 6.0
+# Igual ao timeout padrão das fontes (fontes.TIMEOUT_PADRAO)
+PRAZO_PADRAO = 8.0
+MAX_TENTATIVAS = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAXIMO = 8.0
+MAX_POR_HOST = int(os.getenv("REA_HTTP_MAX_POR_HOST", "4"))
+
+STATUS_REPETIR = {429, 500, 502, 503, 504}
+
+_sessao = None
+_semaforos = {}
+_trava = threading.Lock()
+# Limite (time.monotonic) imposto por `com_prazo` às chamadas desta thread
+_local = threading.local()
+
+
+def obter_sessao():
+    """Sessão compartilhada; as conexões abertas são reaproveitadas entre chamadas"""
+    global _sessao
+    with _trava:
+        if _sessao is None:
+            adaptador = HTTPAdapter(pool_connections=TAMANHO_POOL, pool_maxsize=TAMANHO_POOL)
+            sessao = requests.Session()
+            sessao.mount("https://", adaptador)
+            sessao.mount("http://", adaptador)
+            _sessao = sessao
+    return _sessao
+
+
+def _semaforo_do_host(url):
+    host = urlsplit(url).netloc
+    with _trava:
+        if host not in _semaforos:
+            _semaforos[host] = threading.BoundedSemaphore(MAX_POR_HOST)
+        return _semaforos[host]
+
+
+def _espera(tentativa, resposta=None):
+    """Backoff exponencial com jitter; respeita o Retry-After quando vier"""
+    if resposta is not None:
+        retry_after = resposta.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            return min(float(retry_after), BACKOFF_MAXIMO)
+    limite = min(BACKOFF_MAXIMO, BACKOFF_BASE * 2 ** tentativa)
+    return random.uniform(0, limite)
+
+
+@contextmanager
+def com_prazo(limite):
+    """Dentro do bloco, nenhuma chamada de buscar_json nesta thread passa de `limite` (time.monotonic)"""
+    anterior = getattr(_local, "limite", None)
+    _local.limite = limite if anterior is None else min(limite, anterior)
+    try:
+        yield
+    finally:
+        _local.limite = anterior
+
+
+def _esgotado(url):
+    return requests.Timeout(f"prazo esgotado para {url}")
+
+
+def buscar_json(url, params=None, timeout=(TIMEOUT_CONEXAO, TIMEOUT_LEITURA),
+                tentativas=MAX_TENTATIVAS, prazo=PRAZO_PADRAO):
+    """GET que devolve o JSON da resposta, tentando de novo em falhas temporárias"""
+    sessao = obter_sessao()
+    semaforo = _semaforo_do_host(url)
+    limite = time.monotonic() + prazo
+    if getattr(_local, "limite", None) is not None:
+        limite = min(limite, _local.limite)
+    conexao, leitura = timeout
+    for tentativa in range(tentativas):
+        resposta = None
+        restante = limite - time.monotonic()
+        if restante <= 0 or not semaforo.acquire(timeout=restante):
+            raise _esgotado(url)
+        try:
+            restante = max(limite - time.monotonic(), 0.01)
+            resposta = sessao.get(url, params=params,
+                                  timeout=(min(conexao, restante), min(leitura, restante)))
+            if resposta.status_code not in STATUS_REPETIR:
+                resposta.raise_for_status()
+                return resposta.json()
+        except (requests.ConnectionError, requests.Timeout):
+            if tentativa == tentativas - 1:
+                raise
+        finally:
+            semaforo.release()
+        if tentativa == tentativas - 1:
+            resposta.raise_for_status()
+        espera = _espera(tentativa, resposta)
+        if time.monotonic() + espera >= limite:
+            # Não dá tempo de esperar e tentar de novo
+            if resposta is not None:
+                resposta.raise_for_status()
+            raise _esgotado(url)
+        time.sleep(espera)
@@ -0,0 +1,126 @@
+"""
+Codificação em lote
+===================
+- `codificar_lote`: junta textos repetidos, ordena por tamanho (menos
+  padding em cada lote), faz UMA chamada ao `encode` e devolve os vetores
+  na ordem original.
+- `MicroLote`: junta pedidos que chegam ao mesmo tempo (de threads
+  diferentes) numa única chamada, esperando no máximo `janela_ms`
+  (o orçamento de latência, ajustável por REA_JANELA_MS).
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from modelos import MODELO_PADRAO, obter_modelo
+
+BATCH_SIZE_PADRAO = 64
+
+
+def codificar_lote(modelo, textos, batch_size=BATCH_SIZE_PADRAO):
+    """Igual a modelo.encode(textos), sem codificar o mesmo texto duas vezes"""
+    posicao_unica = {}
+    mapa = np.empty(len(textos), dtype=np.int64)
+    for i, texto in enumerate(textos):
+        mapa[i] = posicao_unica.setdefault(texto, len(posicao_unica))
+    unicos = list(posicao_unica)
+    if not unicos:
+        return np.empty((0, modelo.get_sentence_embedding_dimension()), dtype=np.float32)
+
+    # Textos de tamanho parecido no mesmo lote desperdiçam menos padding
+    ordem = sorted(range(len(unicos)), key=lambda i: len(unicos[i]), reverse=True)
+    vetores_ordenados = modelo.encode(
+        [unicos[i] for i in ordem], batch_size=batch_size, convert_to_numpy=True
+    )
+    vetores = np.empty_like(vetores_ordenados)
+    vetores[ordem] = vetores_ordenados
+    return vetores[mapa]
+
+
+class MicroLote:
+    """
+    Executa `processar(lista_de_itens) -> lista_de_resultados` uma vez para
+    todos os itens que chegaram dentro da janela de tempo.
+    """
+
+    def __init__(self, processar, janela_ms=5, max_lote=BATCH_SIZE_PADRAO):
+        self.processar = processar
+        self.janela = janela_ms / 1000
+        self.max_lote = max_lote
+        self.contadores = {"lotes": 0, "itens": 0}
+        self._fila = queue.Queue()
+        self._thread = None
+        self._trava = threading.Lock()
+
+    def submeter(self, item):
+        """Enfileira o item e devolve um Future com o resultado"""
+        self._iniciar()
+        futuro = Future()
+        self._fila.put((item, futuro))
+        return futuro
+
+    def executar(self, item, timeout=None):
+        return self.submeter(item).result(timeout)
+
+    def _iniciar(self):
+        with self._trava:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._laco, daemon=True, name="micro-lote")
+                self._thread.start()
+
+    def _laco(self):
+        while True:
+            lote = [self._fila.get()]
+            prazo = time.monotonic() + self.janela
+            while len(lote) < self.max_lote:
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(self._fila.get(timeout=restante))
+                except queue.Empty:
+                    break
+
+            self.contadores["lotes"] += 1
+            self.contadores["itens"] += len(lote)
+            try:
+                resultados = self.processar([item for item, _ in lote])
+            except Exception as erro:
+                for _, futuro in lote:
+                    futuro.set_exception(erro)
+                continue
+            for (_, futuro), resultado in zip(lote, resultados):
+                futuro.set_result(resultado)
+
+
+def _codificar_listas(modelo, listas):
+    """Codifica várias listas de textos numa só chamada e separa o resultado"""
+    vetores = codificar_lote(modelo, [texto for textos in listas for texto in textos])
+    fim = np.cumsum([len(textos) for textos in listas])
+    return np.split(vetores, fim[:-1])
+
+
+JANELA_MS_PADRAO = float(os.getenv("REA_JANELA_MS", "5"))
+
+_codificadores = {}
+_trava_codificadores = threading.Lock()
+
+
+def obter_codificador(nome_modelo=MODELO_PADRAO, janela_ms=JANELA_MS_PADRAO):
+    """
+    MicroLote compartilhado: cada item é uma lista de textos e o resultado é
+    a matriz de vetores dela. Pedidos de usuários simultâneos (consulta +
+    títulos novos) viram um único forward pass.
+    """
+    with _trava_codificadores:
+        if nome_modelo not in _codificadores:
+            modelo = obter_modelo(nome_modelo)
+            _codificadores[nome_modelo] = MicroLote(
+                lambda listas: _codificar_listas(modelo, listas), janela_ms=janela_ms
+            )
+        return _codificadores[nome_modelo]
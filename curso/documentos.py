@@ -0,0 +1,125 @@
+"""
+Preparação dos documentos para embeddings
+=========================================
+Em vez de só o título, cada fonte pode usar também a descrição. Descrições
+longas seriam cortadas em silêncio no `max_seq_length` do modelo, então
+são divididas em pedaços (chunks) com sobreposição, medidos em tokens do
+próprio tokenizer. Cada pedaço leva o título na frente.
+
+A pontuação do recurso é a agregação (máximo ou média) das pontuações dos
+seus pedaços. A configuração de cada fonte vem do adaptador dela
+(`documentos=` no registrar_fonte, em fontes.py) e escolhe os campos, a
+agregação e quantos pedaços cada recurso pode gerar, para o custo do encode
+não explodir.
+
+O índice local guarda um vetor por recurso: `agrupar_vetores` junta os
+vetores dos pedaços (máximo ou média por dimensão, conforme a agregação da
+fonte), para o modo local ver o mesmo texto que o online.
+"""
+
+import numpy as np
+
+from busca_vetorial import normalizar
+from fontes import FONTES
+
+# Completa a configuração de cada fonte; fontes sem `documentos` usam só o título
+CONFIG_PADRAO = {"campos": ("nome",), "max_chunks": 1, "sobreposicao": 0, "agregacao": "max"}
+
+
+def config_da_fonte(nome, config_fontes=None):
+    """Configuração de documentos da fonte (a do adaptador, ou a de `config_fontes`) sobre a padrão"""
+    if config_fontes is not None:
+        especifica = config_fontes.get(nome, {})
+    else:
+        especifica = FONTES[nome].documentos if nome in FONTES else {}
+    return {**CONFIG_PADRAO, **especifica}
+
+
+def _dividir_em_tokens(tokenizer, texto, max_tokens, sobreposicao, max_chunks):
+    """Pedaços de `texto` com até max_tokens tokens, cortados nas posições originais"""
+    codificado = tokenizer(texto, add_special_tokens=False, return_offsets_mapping=True)
+    posicoes = codificado["offset_mapping"]
+    if len(posicoes) <= max_tokens:
+        return [texto]
+    passo = max(max_tokens - sobreposicao, 1)
+    pedacos = []
+    for inicio in range(0, len(posicoes), passo):
+        fim = min(inicio + max_tokens, len(posicoes))
+        pedacos.append(texto[posicoes[inicio][0]:posicoes[fim - 1][1]])
+        if fim == len(posicoes) or len(pedacos) == max_chunks:
+            break
+    return pedacos
+
+
+def preparar_documentos(itens, modelo, config_fontes=None):
+    """
+    Gera os textos a codificar e, para cada um, o índice do Recurso de origem.
+
+    Devolve (textos, donos), com donos[i] = posição em `itens` do texto i.
+    """
+    configs = {}
+    tokenizer = modelo.tokenizer
+    # 2 tokens ficam para os especiais ([CLS] e [SEP])
+    limite = modelo.max_seq_length - 2
+
+    textos = []
+    donos = []
+    for posicao, recurso in enumerate(itens):
+        if recurso.fonte not in configs:
+            configs[recurso.fonte] = config_da_fonte(recurso.fonte, config_fontes)
+        config = configs[recurso.fonte]
+        titulo = recurso.nome
+        extras = " ".join(
+            str(getattr(recurso, campo)) for campo in config["campos"]
+            if campo != 'nome' and getattr(recurso, campo)
+        )
+        if not extras or config["max_chunks"] <= 1:
+            pedacos = [f"{titulo}. {extras}" if extras else titulo]
+        else:
+            tokens_titulo = len(tokenizer(titulo, add_special_tokens=False)["input_ids"])
+            max_tokens = max(limite - tokens_titulo - 1, 16)
+            pedacos = [
+                f"{titulo}. {pedaco}"
+                for pedaco in _dividir_em_tokens(tokenizer, extras, max_tokens,
+                                                 config["sobreposicao"], config["max_chunks"])
+            ]
+        textos.extend(pedacos)
+        donos.extend([posicao] * len(pedacos))
+    return textos, np.array(donos, dtype=np.int64)
+
+
+def _usa_media(itens, config_fontes=None):
+    """Máscara dos itens cuja fonte junta os pedaços pela média (os demais, pelo máximo)"""
+    agregacoes = {
+        fonte: config_da_fonte(fonte, config_fontes)["agregacao"] for fonte in {recurso.fonte for recurso in itens}
+    }
+    return np.array([agregacoes[recurso.fonte] == "media" for recurso in itens], dtype=bool)
+
+
+def agregar(similaridades, donos, itens, config_fontes=None):
+    """Junta as similaridades dos pedaços numa por item (máximo ou média, conforme a fonte)"""
+    total = len(itens)
+    maximos = np.full(total, -np.inf, dtype=np.float32)
+    np.maximum.at(maximos, donos, similaridades)
+    media = _usa_media(itens, config_fontes)
+    if not media.any():
+        return maximos
+    somas = np.zeros(total, dtype=np.float32)
+    np.add.at(somas, donos, similaridades)
+    medias = somas / np.maximum(np.bincount(donos, minlength=total), 1)
+    return np.where(media, medias, maximos)
+
+
+def agrupar_vetores(vetores, donos, itens, config_fontes=None):
+    """Um vetor normalizado por item, juntando os vetores dos pedaços dele"""
+    vetores = normalizar(vetores)
+    total = len(itens)
+    maximos = np.full((total, vetores.shape[1]), -np.inf, dtype=np.float32)
+    np.maximum.at(maximos, donos, vetores)
+    media = _usa_media(itens, config_fontes)
+    if media.any():
+        somas = np.zeros_like(maximos)
+        np.add.at(somas, donos, vetores)
+        medias = somas / np.maximum(np.bincount(donos, minlength=total), 1)[:, None]
+        maximos = np.where(media[:, None], medias, maximos)
+    return normalizar(maximos)
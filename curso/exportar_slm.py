@@ -0,0 +1,140 @@
+"""
+Exportação dos SLMs para CPU
+============================
+Gera, na pasta do modelo salvo (ex.: ./meu_slm_categorias), duas versões
+mais leves do modelo fp32:
+
+- modelo_int8.pt: quantização dinâmica do PyTorch (camadas lineares em int8)
+- modelo.onnx:    grafo ONNX, executado pelo ONNX Runtime
+
+Depois mede latência (1 texto por vez), vazão (em lote) e acurácia de cada
+uma contra o fp32, num conjunto separado do treino, e grava tudo em
+artefatos.json. O mais rápido cuja acurácia não cai mais que
+`--tolerancia` fica marcado como "mais_rapido" e é o que o
+`ClassificadorSLM.carregar` passa a usar, enquanto os pesos fp32 forem os
+mesmos da exportação.
+
+Uso:
+    pip install onnx onnxruntime
+    python exportar_slm.py ./meu_slm_categorias --validacao validacao.jsonl --coluna-rotulo categoria
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import torch
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+from inferencia_slm import (ARQUIVO_ARTEFATOS, ARQUIVO_INT8, ARQUIVO_ONNX, ClassificadorSLM,
+                            carregar_modelo, impressao_pesos, ler_textos, quantizar_int8)
+
+
+def exportar_int8(caminho, modelo):
+    modelo_int8 = quantizar_int8(modelo)
+    torch.save(modelo_int8.state_dict(), os.path.join(caminho, ARQUIVO_INT8))
+
+
+def exportar_onnx(caminho, modelo, tokenizer):
+    exemplo = tokenizer(["texto de exemplo"], return_tensors="pt")
+    nomes = list(exemplo.keys())
+    eixos = {nome: {0: "batch", 1: "sequencia"} for nome in nomes}
+    eixos["logits"] = {0: "batch"}
+    with torch.inference_mode():
+        torch.onnx.export(
+            modelo, tuple(exemplo[nome] for nome in nomes), os.path.join(caminho, ARQUIVO_ONNX),
+            input_names=nomes, output_names=["logits"], dynamic_axes=eixos, opset_version=17,
+        )
+
+
+def medir(classificador, textos, rotulos, repeticoes_latencia=20):
+    """Latência p50/p95 com 1 texto, vazão em lote e acurácia"""
+    latencias = []
+    for texto in (textos * repeticoes_latencia)[:repeticoes_latencia]:
+        inicio = time.perf_counter()
+        classificador.classificar([texto])
+        latencias.append(time.perf_counter() - inicio)
+    inicio = time.perf_counter()
+    previstos, _ = classificador.classificar(textos)
+    tempo = time.perf_counter() - inicio
+    medicao = {
+        "latencia_p50_ms": float(np.percentile(latencias, 50) * 1000),
+        "latencia_p95_ms": float(np.percentile(latencias, 95) * 1000),
+        "textos_por_s": len(textos) / tempo,
+    }
+    if rotulos is not None:
+        medicao["acuracia"] = float(np.mean(previstos == classificador.nomes[rotulos]))
+    return medicao
+
+
+def exportar_e_comparar(caminho, textos, rotulos=None, tolerancia=0.01, batch_size=32, max_length=128):
+    """
+    Exporta int8 e ONNX, mede os três artefatos e grava artefatos.json.
+    `rotulos` são os números das classes (como no treino) ou None.
+    """
+    modelo = AutoModelForSequenceClassification.from_pretrained(caminho).eval()
+    tokenizer = AutoTokenizer.from_pretrained(caminho)
+    exportar_int8(caminho, modelo)
+    artefatos = ["fp32", "int8"]
+    try:
+        exportar_onnx(caminho, modelo, tokenizer)
+        artefatos.append("onnx")
+    except Exception as erro:
+        print(f"Exportação ONNX falhou ({erro}); seguindo sem ela")
+
+    rotulos = None if rotulos is None else np.asarray(rotulos)
+    medicoes = {}
+    for artefato in artefatos:
+        try:
+            carregado = carregar_modelo(caminho, artefato)
+        except Exception as erro:
+            print(f"{artefato}: não foi possível carregar ({erro})")
+            continue
+        if artefato == "onnx" and not hasattr(carregado, "sessao"):
+            print("onnx: onnxruntime não instalado")
+            continue
+        classificador = ClassificadorSLM(carregado, tokenizer, batch_size=batch_size, max_length=max_length)
+        medicoes[artefato] = medir(classificador, textos, rotulos)
+        print(f"{artefato:>5}: {medicoes[artefato]}")
+
+    # O mais rápido em lote, desde que a acurácia não caia além da tolerância
+    referencia = medicoes["fp32"].get("acuracia")
+    aceitos = [
+        artefato for artefato, medicao in medicoes.items()
+        if referencia is None or medicao["acuracia"] >= referencia - tolerancia
+    ]
+    mais_rapido = max(aceitos, key=lambda artefato: medicoes[artefato]["textos_por_s"])
+    with open(os.path.join(caminho, ARQUIVO_ARTEFATOS), "w", encoding="utf-8") as arquivo:
+        json.dump({"mais_rapido": mais_rapido, "pesos": impressao_pesos(caminho), "tolerancia": tolerancia,
+                   "medicoes": medicoes}, arquivo, ensure_ascii=False, indent=2)
+    print(f"Artefato escolhido: {mais_rapido}")
+    return mais_rapido, medicoes
+
+
+def _ler_validacao(caminho, coluna_texto, coluna_rotulo, label2id):
+    textos = list(ler_textos(caminho, coluna_texto))
+    if not coluna_rotulo:
+        return textos, None
+    rotulos = []
+    for valor in ler_textos(caminho, coluna_rotulo):
+        valor = str(valor)
+        rotulos.append(int(valor) if valor.lstrip("-").isdigit() else label2id[valor])
+    return textos, rotulos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta o SLM em int8 e ONNX e compara com o fp32")
+    parser.add_argument("modelo", help="pasta do modelo salvo")
+    parser.add_argument("--validacao", required=True, help=".jsonl ou .csv separado do treino")
+    parser.add_argument("--coluna-texto", default="texto")
+    parser.add_argument("--coluna-rotulo", help="número ou nome da classe; sem ela, a acurácia não é medida")
+    parser.add_argument("--tolerancia", type=float, default=0.01, help="queda de acurácia aceita")
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    with open(os.path.join(args.modelo, "config.json"), encoding="utf-8") as arquivo:
+        label2id = json.load(arquivo).get("label2id", {})
+    textos, rotulos = _ler_validacao(args.validacao, args.coluna_texto, args.coluna_rotulo, label2id)
+    exportar_e_comparar(args.modelo, textos, rotulos, args.tolerancia, args.batch_size)
@@ -0,0 +1,252 @@
+"""
+Fontes de REA (Recursos Educacionais Abertos)
+=============================================
+Cada fonte é um adaptador registrado com a função de busca, a chave onde a
+API devolve a lista de itens, um timeout próprio e as funções que
+convertem cada item para um `Recurso`, mais o modelo de texto usado para
+formatá-lo (compilado em formatacao.py), o parâmetro de tamanho de página
+usado pela ingestão e a configuração dos documentos para embeddings
+(documentos.py). O resto do código só enxerga `Recurso` e o registro; para
+adicionar uma fonte (ex.: Aquarela) basta registrar o adaptador dela aqui.
+
+`buscar_todas` dispara todas as fontes ao mesmo tempo e devolve o que
+ficou pronto dentro do prazo de cada uma; `buscar_conforme_chegam` entrega
+cada fonte assim que ela responde. O prazo também vale dentro da busca
+(cliente_http.com_prazo): uma fonte travada libera o worker no prazo dela
+em vez de ocupá-lo até o fim das tentativas.
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, NamedTuple, Optional
+
+from cache_respostas import em_cache
+from cliente_http import buscar_json, com_prazo
+
+TIMEOUT_PADRAO = 8.0
+# Podem apontar para um servidor local (ex.: o do benchmark.py)
+URL_MEDCRED = os.getenv("REA_URL_MEDCRED", "https://api.mecred.c3sl.ufpr.br/public/elastic/search")
+URL_EDUPLAY = os.getenv("REA_URL_EDUPLAY", "https://eduplay.rnp.br/api/v1/search")
+
+
+class Recurso(NamedTuple):
+    """Os campos usados de cada item, iguais para todas as fontes"""
+    fonte: str
+    id: object
+    nome: str
+    descricao: str = ""
+    autor: Optional[str] = None
+    tipo: Optional[str] = None
+    link: Optional[str] = None
+    views: Optional[int] = None
+    likes: Optional[int] = None
+    relevancia: Optional[float] = None
+    reranqueamento: Optional[float] = None
+
+
+class Fonte(NamedTuple):
+    buscar: Callable
+    chave: Optional[str]
+    timeout: float
+    normalizar: Callable     # item da API (dict) -> Recurso
+    modelo: str              # texto de leitura, com {campos} do Recurso
+    padroes: dict            # valor usado quando o campo está vazio
+    pagina: dict             # parâmetro -> tamanho da página (ingestão); vazio = sem paginação
+    documentos: dict         # campos, max_chunks, sobreposicao, agregacao (documentos.py)
+
+
+# nome da fonte -> Fonte
+FONTES = {}
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="fonte-rea")
+
+
+MODELO_GENERICO = "Título do material: {nome}, fonte: {fonte}, relevância: {relevancia}"
+
+
+def registrar_fonte(nome, chave=None, timeout=TIMEOUT_PADRAO, normalizar=None,
+                    modelo=MODELO_GENERICO, padroes=None, pagina=None, documentos=None):
+    """Decorador que adiciona a função de busca (e o adaptador da fonte) ao registro"""
+    if normalizar is None:
+        def normalizar(dados):
+            return Recurso(nome, dados.get('id'), dados.get('name') or '', dados.get('description') or '')
+
+    def decorador(funcao):
+        FONTES[nome] = Fonte(funcao, chave, timeout, normalizar, modelo, padroes or {},
+                             pagina or {}, documentos or {})
+        return funcao
+    return decorador
+
+
+def normalizar_itens(nome, resposta):
+    """Resposta da API -> lista de Recurso, com o adaptador da fonte"""
+    normalizar = FONTES[nome].normalizar
+    return [normalizar(dados) for dados in extrair_itens(resposta, FONTES[nome].chave)]
+
+
+def para_recurso(dados):
+    """Recurso a partir de um dict salvo (ex.: metadados do índice local)"""
+    if "nome" in dados:
+        return Recurso(**dados)
+    # Índices gravados antes dos adaptadores guardavam o item bruto da API
+    return FONTES[dados["fonte"]].normalizar(dados)
+
+
+def extrair_itens(resultado, chave):
+    """Normaliza a resposta da API para uma lista de dicionários"""
+    if isinstance(resultado, dict):
+        return resultado.get(chave, []) if chave else []
+    if isinstance(resultado, list):
+        return resultado
+    return []
+
+
+def _normalizar_medcred(dados):
+    return Recurso(
+        fonte="medcred",
+        id=dados.get('id'),
+        nome=dados.get('name') or '',
+        descricao=dados.get('description') or '',
+        autor=(dados.get('user') or {}).get('name'),
+        views=dados.get('views'),
+        likes=dados.get('likes'),
+    )
+
+
+MODELO_MEDCRED = ("Título do material: {nome}, views do material: {views}, likes do material: {likes}, "
+                  "dono do material: {autor}, relevância em relação ao tema: {relevancia}")
+PADROES_MEDCRED = {"nome": "Sem título", "views": "Não descrito", "likes": "Não descrito",
+                   "autor": "Desconhecido", "relevancia": "Erro"}
+
+
+def _normalizar_eduplay(dados):
+    return Recurso(
+        fonte="eduplay",
+        id=dados.get('id'),
+        nome=dados.get('name') or '',
+        descricao=dados.get('description') or '',
+        autor=(dados.get('userOwner') or {}).get('name'),
+        tipo=dados.get('contentType'),
+        link=dados.get('embedUrl'),
+    )
+
+
+MODELO_EDUPLAY = ("Título do material: {nome}, descrição do material: {descricao}, tipo de material: {tipo}, "
+                  "dono do material: {autor}, link do material: {link}, relevância: {relevancia}")
+PADROES_EDUPLAY = {"nome": "Sem título", "descricao": "Sem descricao", "tipo": "Desconhecido",
+                   "autor": "Desconhecido", "link": "Não possui", "relevancia": "Erro"}
+
+
+@registrar_fonte("medcred", chave="results", normalizar=_normalizar_medcred,
+                 modelo=MODELO_MEDCRED, padroes=PADROES_MEDCRED, pagina={"limite": 100},
+                 documentos={"campos": ("nome", "descricao"), "max_chunks": 2, "sobreposicao": 32})
+@em_cache("medcred")
+def buscarReaMedcred(assunto, limite=30, pagina=1):
+    url = URL_MEDCRED
+    params = {
+        "indexes":"resources",
+        "query":assunto,
+        "limit":limite
+    }
+    if pagina > 1:
+        params["page"] = pagina
+    return buscar_json(url, params=params)
+
+
+@registrar_fonte("eduplay", chave="contents", normalizar=_normalizar_eduplay,
+                 modelo=MODELO_EDUPLAY, padroes=PADROES_EDUPLAY, pagina={"quantidade": 100},
+                 documentos={"campos": ("nome", "descricao"), "max_chunks": 3, "sobreposicao": 32})
+@em_cache("eduplay")
+def buscarReaEduplay(assunto, quantidade=30, pagina=1):
+    url = URL_EDUPLAY
+    params = {
+         "term":assunto,
+         "quantity":quantidade,
+         "page":pagina,
+         "type":0,
+         "order":0
+    }
+    return buscar_json(url, params=params)
+
+
+@registrar_fonte("aquarela")
+def buscarReaAquarela(assunto):
+    return
+
+
+def _buscar_no_prazo(nome, assunto, limite):
+    with com_prazo(limite):
+        return FONTES[nome].buscar(assunto)
+
+
+def _disparar(nomes, assunto, timeouts, inicio):
+    """Submete a busca de cada fonte com o prazo dela; devolve {nome: Future}"""
+    return {
+        nome: _executor.submit(_buscar_no_prazo, nome, assunto,
+                               inicio + timeouts.get(nome, FONTES[nome].timeout))
+        for nome in nomes
+    }
+
+
+def buscar_todas(assunto, fontes=None, timeouts=None):
+    """
+    Consulta as fontes em paralelo e devolve {fonte: [Recurso, ...]}.
+
+    Fontes que falharem ou estourarem o
+    próprio timeout ficam de fora, sem atrasar as demais.
+    """
+    nomes = list(fontes or FONTES)
+    timeouts = timeouts or {}
+    inicio = time.monotonic()
+    pendentes = _disparar(nomes, assunto, timeouts, inicio)
+
+    resultados = {}
+    for nome, futuro in pendentes.items():
+        # O prazo conta a partir do disparo, então esperar uma fonte
+        # não consome o tempo das outras
+        restante = timeouts.get(nome, FONTES[nome].timeout) - (time.monotonic() - inicio)
+        try:
+            resposta = futuro.result(timeout=max(restante, 0))
+        except Exception:
+            futuro.cancel()
+            continue
+        resultados[nome] = normalizar_itens(nome, resposta)
+    return resultados
+
+
+async def buscar_conforme_chegam(assunto, fontes=None, timeouts=None):
+    """
+    Gerador assíncrono de (fonte, [Recurso, ...]), na ordem em que as fontes respondem.
+
+    Mesmas regras de `buscar_todas`: cada fonte tem o próprio prazo e as que
+    falharem ou atrasarem são descartadas.
+    """
+    nomes = list(fontes or FONTES)
+    timeouts = timeouts or {}
+    loop = asyncio.get_running_loop()
+    inicio = loop.time()
+    tarefas = {
+        asyncio.wrap_future(futuro): nome
+        for nome, futuro in _disparar(nomes, assunto, timeouts, time.monotonic()).items()
+    }
+    prazos = {nome: inicio + timeouts.get(nome, FONTES[nome].timeout) for nome in nomes}
+
+    pendentes = set(tarefas)
+    while pendentes:
+        proximo_prazo = min(prazos[tarefas[tarefa]] for tarefa in pendentes)
+        prontas, pendentes = await asyncio.wait(
+            pendentes, timeout=max(proximo_prazo - loop.time(), 0),
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        for tarefa in prontas:
+            if tarefa.cancelled() or tarefa.exception() is not None:
+                continue
+            nome = tarefas[tarefa]
+            yield nome, normalizar_itens(nome, tarefa.result())
+
+        vencidas = {tarefa for tarefa in pendentes if prazos[tarefas[tarefa]] <= loop.time()}
+        for tarefa in vencidas:
+            tarefa.cancel()
+        pendentes -= vencidas
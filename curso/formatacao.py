@@ -0,0 +1,113 @@
+"""
+Formatação dos resultados
+=========================
+Cada fonte declara em fontes.py um modelo de texto (ex.: "Título: {nome},
+likes: {likes}") e os valores padrão dos campos vazios. O modelo é
+compilado no primeiro uso: os nomes dos campos viram posições e um
+`attrgetter` tira todos os valores do Recurso de uma vez, sem `.get()` por
+campo.
+
+As saídas são geradas linha a linha, então exportar milhares de resultados
+não monta uma string gigante na memória:
+    escrever_texto(resultados, arquivo)   # texto para leitura
+    escrever_jsonl(resultados, arquivo)   # um JSON por linha
+O destino pode ser um arquivo (ou qualquer objeto com .write) ou um socket.
+"""
+
+import json
+import socket
+import string
+from contextlib import contextmanager
+from operator import attrgetter
+
+from fontes import FONTES, MODELO_GENERICO
+
+_codificador_json = json.JSONEncoder(ensure_ascii=False)
+# nome da fonte -> função Recurso -> texto
+_compilados = {}
+
+
+def compilar_modelo(texto, padroes=None):
+    """
+    Devolve uma função Recurso -> linha de texto. `padroes` dá o valor usado
+    quando o campo é None ou vazio.
+    """
+    padroes = padroes or {}
+    campos = []
+    partes = []
+    for literal, campo, especificacao, conversao in string.Formatter().parse(texto):
+        partes.append(literal.replace("{", "{{").replace("}", "}}"))
+        if campo is None:
+            continue
+        partes.append("{%d%s%s}" % (len(campos), "!" + conversao if conversao else "",
+                                    ":" + especificacao if especificacao else ""))
+        campos.append(campo)
+
+    modelo = "".join(partes).format
+    substitutos = [padroes.get(campo) for campo in campos]
+    obter = attrgetter(*campos) if campos else (lambda recurso: ())
+    # Com um campo só, o attrgetter devolve o valor em vez de uma tupla
+    extrair = (lambda recurso: (obter(recurso),)) if len(campos) == 1 else obter
+
+    def formatar(recurso):
+        valores = extrair(recurso)
+        return modelo(*[
+            substituto if substituto is not None and (valor is None or valor == "") else valor
+            for valor, substituto in zip(valores, substitutos)
+        ])
+    return formatar
+
+
+def formatar(recurso):
+    """Texto de leitura do recurso, com o modelo da fonte dele"""
+    funcao = _compilados.get(recurso.fonte)
+    if funcao is None:
+        fonte = FONTES.get(recurso.fonte)
+        funcao = (compilar_modelo(fonte.modelo, fonte.padroes) if fonte
+                  else compilar_modelo(MODELO_GENERICO))
+        _compilados[recurso.fonte] = funcao
+    return funcao(recurso)
+
+
+def linhas_texto(recursos):
+    """Gera uma linha (já com o '\\n') por recurso"""
+    for recurso in recursos:
+        yield formatar(recurso) + "\n"
+
+
+def linhas_jsonl(recursos):
+    for recurso in recursos:
+        yield _codificador_json.encode(recurso._asdict()) + "\n"
+
+
+@contextmanager
+def _abrir_destino(destino):
+    """Aceita um objeto com .write ou um socket conectado"""
+    if isinstance(destino, socket.socket):
+        arquivo = destino.makefile("w", encoding="utf-8")
+        try:
+            yield arquivo
+        finally:
+            arquivo.close()
+    else:
+        yield destino
+
+
+def _escrever(linhas, destino):
+    total = 0
+    with _abrir_destino(destino) as arquivo:
+        for linha in linhas:
+            arquivo.write(linha)
+            total += 1
+        arquivo.flush()
+    return total
+
+
+def escrever_texto(recursos, destino):
+    """Escreve o texto de leitura no destino, uma linha por vez. Devolve quantas linhas"""
+    return _escrever(linhas_texto(recursos), destino)
+
+
+def escrever_jsonl(recursos, destino):
+    """Escreve um JSON por linha no destino. Devolve quantas linhas"""
+    return _escrever(linhas_jsonl(recursos), destino)
@@ -0,0 +1,208 @@
+"""
+Índice local de REA
+===================
+Vetores (normalizados) de todo o catálogo + os metadados de cada recurso,
+gravados em disco pelo `ingestao.py`. Permite responder o `retrieve()` sem
+nenhuma chamada de rede. O tipo de índice vetorial (exato, ivf, hnsw,
+fp16, int8, binario) fica registrado em info.json e é escolhido na ingestão.
+
+Nada é copiado para a memória na carga: os vetores são abertos com
+`np.load(mmap_mode="r")` e os metadados são lidos sob demanda a partir de
+metadados.jsonl, usando as posições (em bytes) de cada linha guardadas em
+offsets.npy. Vários processos servindo o retrieve() compartilham as mesmas
+páginas do cache do sistema operacional.
+
+Por isso uma nova ingestão nunca reescreve os arquivos no lugar (truncar um
+arquivo mapeado derruba quem o está lendo): o índice inteiro é gravado numa
+pasta ao lado e trocado com `os.replace`. Quem já tinha o índice antigo
+aberto continua lendo os arquivos antigos até recarregar.
+"""
+
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+from bm25 import IndiceBM25, completar_prefiltro, fundir
+from busca_vetorial import normalizar, buscar_top_k
+from fontes import para_recurso
+from indices import carregar_indice, criar_indice
+import quantizacao  # registra os tipos fp16, int8 e binario em INDICES
+
+PASTA_PADRAO = os.getenv("REA_INDICE_LOCAL", "indice_rea")
+ARQUIVO_EMBEDDINGS = "embeddings.npy"
+ARQUIVO_METADADOS = "metadados.jsonl"
+ARQUIVO_OFFSETS = "offsets.npy"
+ARQUIVO_INFO = "info.json"
+
+
+class MetadadosMapeados:
+    """Lista somente leitura dos Recurso, decodificados do JSON só quando acessados"""
+
+    def __init__(self, caminho_jsonl, offsets):
+        self.offsets = offsets
+        tamanho = os.path.getsize(caminho_jsonl)
+        self._dados = np.memmap(caminho_jsonl, dtype=np.uint8, mode="r") if tamanho else np.empty(0, np.uint8)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, posicao):
+        posicao = int(posicao)
+        if posicao < 0:
+            posicao += len(self)
+        inicio, fim = self.offsets[posicao], self.offsets[posicao + 1]
+        return para_recurso(json.loads(self._dados[inicio:fim].tobytes().decode("utf-8")))
+
+    def __iter__(self):
+        for posicao in range(len(self)):
+            yield self[posicao]
+
+
+def _calcular_offsets(caminho_jsonl):
+    """Posições de início de cada linha (para índices gerados antes do offsets.npy)"""
+    offsets = [0]
+    with open(caminho_jsonl, "rb") as arquivo:
+        for linha in arquivo:
+            offsets.append(offsets[-1] + len(linha))
+    return np.array(offsets, dtype=np.int64)
+
+
+def _trocar_pasta(temporaria, pasta):
+    """Põe `temporaria` no lugar de `pasta` sem escrever em nenhum arquivo da antiga"""
+    antiga = pasta + ".antigo"
+    shutil.rmtree(antiga, ignore_errors=True)
+    if os.path.exists(pasta):
+        os.replace(pasta, antiga)
+    os.replace(temporaria, pasta)
+    # Arquivos ainda mapeados por outros processos continuam válidos até serem fechados
+    shutil.rmtree(antiga, ignore_errors=True)
+
+
+def salvar_indice(pasta, embeddings, itens, nome_modelo, tipo_indice="exato",
+                  textos_lexicos=None, **parametros):
+    """
+    Constrói o índice vetorial (e o BM25, se vierem `textos_lexicos`) e grava
+    os vetores, um Recurso em JSON por linha e as informações.
+    """
+    pasta = os.path.normpath(pasta)
+    # Tudo é gravado ao lado e só entra no lugar da pasta atual no fim
+    temporaria = pasta + ".novo"
+    shutil.rmtree(temporaria, ignore_errors=True)
+    os.makedirs(temporaria)
+    vetores = normalizar(embeddings)
+    indice = criar_indice(tipo_indice, **parametros).construir(vetores)
+    indice.salvar(temporaria)
+    if textos_lexicos is not None:
+        IndiceBM25().construir(textos_lexicos).salvar(temporaria)
+    # Os vetores ficam sempre disponíveis para reconstruir o índice, medir o
+    # recall e pontuar o pré-filtro; sempre os desta ingestão, nunca os de uma anterior
+    if not getattr(indice, "grava_embeddings", False):
+        np.save(os.path.join(temporaria, ARQUIVO_EMBEDDINGS), vetores)
+    offsets = np.zeros(len(itens) + 1, dtype=np.int64)
+    with open(os.path.join(temporaria, ARQUIVO_METADADOS), "wb") as arquivo:
+        for posicao, item in enumerate(itens):
+            linha = (json.dumps(item._asdict(), ensure_ascii=False) + "\n").encode("utf-8")
+            arquivo.write(linha)
+            offsets[posicao + 1] = offsets[posicao] + len(linha)
+    np.save(os.path.join(temporaria, ARQUIVO_OFFSETS), offsets)
+    with open(os.path.join(temporaria, ARQUIVO_INFO), "w", encoding="utf-8") as arquivo:
+        json.dump({"modelo": nome_modelo, "total": len(itens), "tipo_indice": tipo_indice,
+                   "parametros": parametros}, arquivo)
+    _trocar_pasta(temporaria, pasta)
+
+
+class IndiceLocal:
+    def __init__(self, indice, itens, nome_modelo, bm25=None, vetores=None):
+        self.indice = indice
+        self.itens = itens
+        self.nome_modelo = nome_modelo
+        self.bm25 = bm25
+        # Vetores float32 (mapeados) para pontuar só os candidatos do pré-filtro
+        self.vetores = vetores
+
+    @classmethod
+    def carregar(cls, pasta=PASTA_PADRAO):
+        with open(os.path.join(pasta, ARQUIVO_INFO), encoding="utf-8") as arquivo:
+            info = json.load(arquivo)
+        indice = carregar_indice(pasta, info.get("tipo_indice", "exato"), **info.get("parametros", {}))
+        caminho_jsonl = os.path.join(pasta, ARQUIVO_METADADOS)
+        caminho_offsets = os.path.join(pasta, ARQUIVO_OFFSETS)
+        if os.path.exists(caminho_offsets):
+            offsets = np.load(caminho_offsets, mmap_mode="r")
+        else:
+            offsets = _calcular_offsets(caminho_jsonl)
+        bm25 = IndiceBM25.carregar(pasta) if IndiceBM25.existe(pasta) else None
+        caminho_vetores = os.path.join(pasta, ARQUIVO_EMBEDDINGS)
+        vetores = np.load(caminho_vetores, mmap_mode="r") if os.path.exists(caminho_vetores) else None
+        return cls(indice, MetadadosMapeados(caminho_jsonl, offsets), info["modelo"], bm25, vetores)
+
+    def __len__(self):
+        return len(self.itens)
+
+    def buscar(self, embeddings_consultas, k=5, similaridade_minima=None):
+        """Lista de [(Recurso, similaridade), ...] por consulta"""
+        resultados = []
+        for indices, similaridades in self.indice.buscar(embeddings_consultas, k):
+            if similaridade_minima is not None:
+                mascara = similaridades >= similaridade_minima
+                indices, similaridades = indices[mascara], similaridades[mascara]
+            resultados.append([
+                (self.itens[indx], float(similaridade)) for indx, similaridade in zip(indices, similaridades)
+            ])
+        return resultados
+
+
+    def _similaridades(self, indices, embedding_consulta):
+        """Cosseno (vetores float32 do disco) entre a consulta e cada documento de `indices`"""
+        consulta = normalizar(np.atleast_2d(embedding_consulta))[0]
+        return np.asarray(self.vetores[indices]) @ consulta
+
+    def buscar_hibrido(self, consulta, embedding_consulta, k=5, estrategia="rrf", n_candidatos=100):
+        """
+        Junta a busca vetorial com a BM25 (nome + descrição).
+
+        "rrf"/"ponderado": funde os n_candidatos melhores de cada busca.
+        "prefiltro": a BM25 escolhe os candidatos e só eles são pontuados
+        pelos vetores; se forem menos que k, a busca vetorial completa o
+        resultado. Sem índice BM25, cai na busca vetorial pura.
+        A similaridade devolvida é sempre o cosseno com a consulta.
+        """
+        if self.bm25 is None:
+            return self.buscar(embedding_consulta, k)[0]
+
+        indices_lexicos, pontuacoes_lexicas = self.bm25.buscar(consulta, n_candidatos)
+        if estrategia == "prefiltro":
+            if not len(indices_lexicos) or self.vetores is None:
+                return self.buscar(embedding_consulta, k)[0]
+            candidatos = np.sort(indices_lexicos)
+            posicoes, similaridades = buscar_top_k(embedding_consulta, self.vetores[candidatos], k)[0]
+            indices = candidatos[posicoes]
+            if len(indices) < k:
+                indices_vetoriais, pontuacoes_vetoriais = self.indice.buscar(embedding_consulta, 2 * k)[0]
+                indices, similaridades = completar_prefiltro(indices, similaridades, indices_vetoriais,
+                                                             pontuacoes_vetoriais, k)
+        else:
+            indices_vetoriais, pontuacoes_vetoriais = self.indice.buscar(embedding_consulta, n_candidatos)[0]
+            indices, _ = fundir(estrategia, indices_vetoriais, pontuacoes_vetoriais,
+                                indices_lexicos, pontuacoes_lexicas)
+            # A fusão só define a ordem; a similaridade devolvida é o cosseno
+            indices = indices[:k]
+            similaridades = self._similaridades(indices, embedding_consulta)
+        return [(self.itens[indx], float(similaridade))
+                for indx, similaridade in zip(indices[:k], similaridades[:k])]
+
+
+_indice = None
+_trava = threading.Lock()
+
+
+def obter_indice_local(pasta=PASTA_PADRAO):
+    """Índice compartilhado pelo processo, carregado do disco no primeiro uso"""
+    global _indice
+    with _trava:
+        if _indice is None:
+            _indice = IndiceLocal.carregar(pasta)
+    return _indice
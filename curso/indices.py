@@ -0,0 +1,289 @@
+"""
+Índices vetoriais
+=================
+Todos os índices têm a mesma interface (construir, adicionar, buscar,
+salvar, carregar) e trabalham com vetores normalizados, onde a
+similaridade de cosseno é o produto escalar.
+
+- "exato": força bruta com NumPy (referência para medir o recall)
+- "ivf":   IVF em NumPy puro; agrupa os vetores com k-means e, na busca,
+           só visita as `n_sondas` listas com centróides mais próximos
+- "hnsw":  grafo HNSW do FAISS (só aparece se o faiss estiver instalado)
+
+Os índices com vetores quantizados (fp16, int8, binario) ficam em
+quantizacao.py e se registram em INDICES quando ele é importado.
+
+Para medir o recall@k de um índice em relação ao exato:
+    python indices.py --pasta indice_rea --tipo ivf --k 10
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from busca_vetorial import normalizar, buscar_top_k
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+ARQUIVO_EMBEDDINGS = "embeddings.npy"
+
+
+class IndiceExato:
+    tipo = "exato"
+    # O salvar() já grava embeddings.npy (o salvar_indice não precisa gravar de novo)
+    grava_embeddings = True
+
+    def __init__(self):
+        self.embeddings = None
+
+    def __len__(self):
+        return 0 if self.embeddings is None else len(self.embeddings)
+
+    def construir(self, embeddings):
+        self.embeddings = normalizar(embeddings)
+        return self
+
+    def adicionar(self, embeddings):
+        if self.embeddings is None:
+            return self.construir(embeddings)
+        self.embeddings = np.concatenate([self.embeddings, normalizar(embeddings)])
+        return self
+
+    def buscar(self, consultas, k=5):
+        """Lista com um par (indices, similaridades) por consulta"""
+        return buscar_top_k(consultas, self.embeddings, k)
+
+    def salvar(self, pasta):
+        os.makedirs(pasta, exist_ok=True)
+        np.save(os.path.join(pasta, ARQUIVO_EMBEDDINGS), self.embeddings)
+
+    @classmethod
+    def carregar(cls, pasta, **kwargs):
+        indice = cls(**kwargs)
+        # Mapeado do disco: carga instantânea e páginas compartilhadas entre processos
+        indice.embeddings = np.load(os.path.join(pasta, ARQUIVO_EMBEDDINGS), mmap_mode="r")
+        return indice
+
+
+def _kmeans_esferico(vetores, n_grupos, n_iteracoes=20, semente=0):
+    """k-means com similaridade de cosseno; devolve centróides normalizados"""
+    gerador = np.random.default_rng(semente)
+    centroides = vetores[gerador.choice(len(vetores), n_grupos, replace=False)]
+    for _ in range(n_iteracoes):
+        grupos = _mais_proximo(vetores, centroides)
+        somas = np.zeros_like(centroides)
+        np.add.at(somas, grupos, vetores)
+        vazios = ~somas.any(axis=1)
+        # Grupo vazio: recomeça de um ponto aleatório
+        somas[vazios] = vetores[gerador.choice(len(vetores), vazios.sum())]
+        centroides = normalizar(somas)
+    return centroides
+
+
+def _mais_proximo(vetores, centroides, tamanho_bloco=65536):
+    """Índice do centróide mais similar a cada vetor, em blocos para poupar memória"""
+    grupos = np.empty(len(vetores), dtype=np.int64)
+    for inicio in range(0, len(vetores), tamanho_bloco):
+        bloco = vetores[inicio:inicio + tamanho_bloco]
+        grupos[inicio:inicio + tamanho_bloco] = np.argmax(bloco @ centroides.T, axis=1)
+    return grupos
+
+
+class IndiceIVF(IndiceExato):
+    tipo = "ivf"
+
+    def __init__(self, n_listas=None, n_sondas=8, amostra_treino=256):
+        super().__init__()
+        self.n_listas = n_listas
+        self.n_sondas = n_sondas
+        self.amostra_treino = amostra_treino
+        self.centroides = None
+        self.ids_por_lista = None   # ids dos vetores, agrupados por lista
+        self.inicios = None         # lista i ocupa ids_por_lista[inicios[i]:inicios[i+1]]
+
+    def construir(self, embeddings):
+        super().construir(embeddings)
+        total = len(self.embeddings)
+        n_listas = self.n_listas or max(1, int(np.sqrt(total)))
+        self.n_listas = min(n_listas, total)
+
+        gerador = np.random.default_rng(0)
+        tamanho_amostra = min(total, self.n_listas * self.amostra_treino)
+        amostra = self.embeddings[gerador.choice(total, tamanho_amostra, replace=False)]
+        self.centroides = _kmeans_esferico(amostra, self.n_listas)
+        self._distribuir()
+        return self
+
+    def adicionar(self, embeddings):
+        if self.centroides is None:
+            return self.construir(embeddings)
+        # Os centróides continuam os mesmos; só os novos vetores são distribuídos
+        self.embeddings = np.concatenate([self.embeddings, normalizar(embeddings)])
+        self._distribuir()
+        return self
+
+    def _distribuir(self):
+        grupos = _mais_proximo(self.embeddings, self.centroides)
+        self.ids_por_lista = np.argsort(grupos, kind="stable")
+        contagem = np.bincount(grupos, minlength=self.n_listas)
+        self.inicios = np.concatenate([[0], np.cumsum(contagem)])
+
+    def buscar(self, consultas, k=5):
+        matriz_consultas = normalizar(np.atleast_2d(consultas))
+        n_sondas = min(self.n_sondas, self.n_listas)
+        listas_por_consulta = np.argpartition(
+            -(matriz_consultas @ self.centroides.T), n_sondas - 1, axis=1
+        )[:, :n_sondas]
+
+        resultados = []
+        for consulta, listas in zip(matriz_consultas, listas_por_consulta):
+            candidatos = np.concatenate([
+                self.ids_por_lista[self.inicios[lista]:self.inicios[lista + 1]] for lista in listas
+            ])
+            indices, similaridades = buscar_top_k(consulta, self.embeddings[candidatos], k)[0]
+            resultados.append((candidatos[indices], similaridades))
+        return resultados
+
+    def salvar(self, pasta):
+        super().salvar(pasta)
+        np.save(os.path.join(pasta, "ivf_centroides.npy"), self.centroides)
+        np.save(os.path.join(pasta, "ivf_ids.npy"), self.ids_por_lista)
+        np.save(os.path.join(pasta, "ivf_inicios.npy"), self.inicios)
+
+    @classmethod
+    def carregar(cls, pasta, **kwargs):
+        indice = super().carregar(pasta, **kwargs)
+        indice.centroides = np.load(os.path.join(pasta, "ivf_centroides.npy"), mmap_mode="r")
+        indice.ids_por_lista = np.load(os.path.join(pasta, "ivf_ids.npy"), mmap_mode="r")
+        indice.inicios = np.load(os.path.join(pasta, "ivf_inicios.npy"), mmap_mode="r")
+        indice.n_listas = len(indice.centroides)
+        return indice
+
+
+class IndiceHNSW:
+    tipo = "hnsw"
+
+    def __init__(self, m=32, ef_construcao=200, ef_busca=64):
+        self.m = m
+        self.ef_construcao = ef_construcao
+        self.ef_busca = ef_busca
+        self.faiss_indice = None
+
+    def __len__(self):
+        return 0 if self.faiss_indice is None else self.faiss_indice.ntotal
+
+    def construir(self, embeddings):
+        vetores = normalizar(embeddings)
+        self.faiss_indice = faiss.IndexHNSWFlat(vetores.shape[1], self.m, faiss.METRIC_INNER_PRODUCT)
+        self.faiss_indice.hnsw.efConstruction = self.ef_construcao
+        self.faiss_indice.add(vetores)
+        return self
+
+    def adicionar(self, embeddings):
+        if self.faiss_indice is None:
+            return self.construir(embeddings)
+        self.faiss_indice.add(normalizar(embeddings))
+        return self
+
+    def buscar(self, consultas, k=5):
+        self.faiss_indice.hnsw.efSearch = max(self.ef_busca, k)
+        similaridades, indices = self.faiss_indice.search(normalizar(np.atleast_2d(consultas)), k)
+        # O FAISS completa com -1 quando há menos de k vizinhos
+        return [(linha_i[linha_i >= 0], linha_s[linha_i >= 0]) for linha_i, linha_s in zip(indices, similaridades)]
+
+    def salvar(self, pasta):
+        os.makedirs(pasta, exist_ok=True)
+        faiss.write_index(self.faiss_indice, os.path.join(pasta, "hnsw.faiss"))
+
+    @classmethod
+    def carregar(cls, pasta, **kwargs):
+        indice = cls(**kwargs)
+        indice.faiss_indice = faiss.read_index(os.path.join(pasta, "hnsw.faiss"))
+        return indice
+
+
+INDICES = {"exato": IndiceExato, "ivf": IndiceIVF}
+if faiss is not None:
+    INDICES["hnsw"] = IndiceHNSW
+
+
+def criar_indice(tipo="exato", **kwargs):
+    if tipo not in INDICES:
+        raise ValueError(f"Tipo de índice desconhecido ou indisponível: {tipo} (opções: {list(INDICES)})")
+    return INDICES[tipo](**kwargs)
+
+
+def carregar_indice(pasta, tipo="exato", **kwargs):
+    if tipo not in INDICES:
+        raise ValueError(f"Tipo de índice desconhecido ou indisponível: {tipo} (opções: {list(INDICES)})")
+    return INDICES[tipo].carregar(pasta, **kwargs)
+
+
+def recall_em_k(indice, exato, consultas, k=10):
+    """Fração dos k vizinhos exatos que o índice também encontrou (média das consultas)"""
+    esperados = exato.buscar(consultas, k)
+    obtidos = indice.buscar(consultas, k)
+    acertos = [
+        len(np.intersect1d(esperado[0], obtido[0])) / max(len(esperado[0]), 1)
+        for esperado, obtido in zip(esperados, obtidos)
+    ]
+    return float(np.mean(acertos))
+
+
+def avaliar(indice, exato, consultas, k=10):
+    """Mede o tempo médio de busca e o recall@k do índice contra o exato"""
+    tempos = {}
+    for nome, alvo in (("exato", exato), ("indice", indice)):
+        inicio = time.perf_counter()
+        alvo.buscar(consultas, k)
+        tempos[nome] = (time.perf_counter() - inicio) / len(consultas) * 1000
+    return {
+        "tipo": indice.tipo,
+        "ms_por_consulta": tempos["indice"],
+        "ms_por_consulta_exato": tempos["exato"],
+        f"recall@{k}": recall_em_k(indice, exato, consultas, k),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara um índice aproximado com a busca exata")
+    parser.add_argument("--pasta", default="indice_rea")
+    parser.add_argument("--tipo", default="ivf", choices=list(INDICES))
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--consultas", type=int, default=200)
+    parser.add_argument("--n-sondas", type=int, nargs="*", default=[1, 4, 8, 16, 32],
+                        help="valores testados no IVF")
+    parser.add_argument("--ef-busca", type=int, nargs="*", default=[16, 32, 64, 128],
+                        help="valores testados no HNSW")
+    args = parser.parse_args()
+
+    embeddings = np.load(os.path.join(args.pasta, ARQUIVO_EMBEDDINGS))
+    gerador = np.random.default_rng(1)
+    # Consultas = vetores do próprio catálogo com um pouco de ruído
+    amostra = embeddings[gerador.choice(len(embeddings), min(args.consultas, len(embeddings)), replace=False)]
+    consultas = amostra + gerador.normal(scale=0.05, size=amostra.shape).astype(np.float32)
+
+    exato = IndiceExato().construir(embeddings)
+    inicio = time.perf_counter()
+    indice = criar_indice(args.tipo).construir(embeddings)
+    print(f"Índice {args.tipo} construído em {time.perf_counter() - inicio:.2f}s ({len(embeddings)} vetores)")
+
+    # O índice é construído uma vez; só o parâmetro de busca muda
+    if args.tipo == "ivf":
+        variacoes = [("n_sondas", valor) for valor in args.n_sondas]
+    elif args.tipo == "hnsw":
+        variacoes = [("ef_busca", valor) for valor in args.ef_busca]
+    else:
+        variacoes = [(None, None)]
+    for parametro, valor in variacoes:
+        if parametro:
+            setattr(indice, parametro, valor)
+        relatorio = avaliar(indice, exato, consultas, args.k)
+        if parametro:
+            relatorio[parametro] = valor
+        print(relatorio)
@@ -0,0 +1,204 @@
+"""
+Inferência em lote dos SLMs treinados
+=====================================
+Classifica muitos textos de uma vez em vez de chamar o modelo texto a texto:
+os textos são lidos em blocos, ordenados por tamanho dentro do bloco (para
+os batches terem pouco padding), tokenizados com padding dinâmico e
+passados pelo modelo em `torch.inference_mode()`.
+
+Entradas grandes são consumidas como gerador: a memória depende só de
+`batch_size` e do tamanho do bloco, não do arquivo.
+
+`ClassificadorSLM.carregar` escolhe sozinho o artefato mais rápido gerado
+pelo exportar_slm.py (ONNX Runtime, int8 ou o fp32 original), conforme o
+artefatos.json da pasta do modelo. O artefatos.json guarda também a
+impressão dos pesos fp32 de onde os artefatos saíram; se o modelo foi
+treinado e salvo de novo depois disso, o fp32 é usado até a próxima exportação.
+
+Uso:
+    python inferencia_slm.py ./meu_slm_categorias descricoes.jsonl --coluna description --saida rotulos.jsonl
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from itertools import islice
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+from transformers import AutoConfig, AutoModelForSequenceClassification, AutoTokenizer
+
+ARQUIVO_ARTEFATOS = "artefatos.json"
+ARQUIVO_INT8 = "modelo_int8.pt"
+ARQUIVO_ONNX = "modelo.onnx"
+# Pesos fp32 gravados pelo save_pretrained (o primeiro que existir)
+ARQUIVOS_PESOS = ("model.safetensors", "pytorch_model.bin")
+
+
+def quantizar_int8(modelo):
+    """Quantização dinâmica: pesos das camadas lineares em int8, ativações em float"""
+    return torch.quantization.quantize_dynamic(modelo, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class ModeloOnnx:
+    """Sessão do ONNX Runtime com a mesma interface do modelo do transformers"""
+
+    def __init__(self, caminho):
+        import onnxruntime
+
+        opcoes = onnxruntime.SessionOptions()
+        opcoes.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.sessao = onnxruntime.InferenceSession(os.path.join(caminho, ARQUIVO_ONNX), opcoes,
+                                                   providers=["CPUExecutionProvider"])
+        self.entradas = {entrada.name for entrada in self.sessao.get_inputs()}
+        self.config = AutoConfig.from_pretrained(caminho)
+
+    def eval(self):
+        return self
+
+    def __call__(self, **entradas):
+        valores = {nome: tensor.numpy() for nome, tensor in entradas.items() if nome in self.entradas}
+        return SimpleNamespace(logits=torch.from_numpy(self.sessao.run(["logits"], valores)[0]))
+
+
+def impressao_pesos(caminho):
+    """Identifica os pesos fp32 salvos (nome, tamanho e data de modificação do arquivo)"""
+    for nome in ARQUIVOS_PESOS:
+        arquivo = os.path.join(caminho, nome)
+        if os.path.exists(arquivo):
+            estado = os.stat(arquivo)
+            return f"{nome}:{estado.st_size}:{estado.st_mtime_ns}"
+    return None
+
+
+def artefato_mais_rapido(caminho):
+    """
+    Nome do artefato indicado no artefatos.json ("fp32" se não houver ou se
+    os artefatos vieram de pesos diferentes dos salvos agora)
+    """
+    arquivo = os.path.join(caminho, ARQUIVO_ARTEFATOS)
+    if not os.path.exists(arquivo):
+        return "fp32"
+    with open(arquivo, encoding="utf-8") as entrada:
+        artefatos = json.load(entrada)
+    if artefatos.get("pesos") != impressao_pesos(caminho):
+        print(f"{ARQUIVO_ARTEFATOS} é de um treino anterior; usando o fp32 (rode o exportar_slm.py de novo)")
+        return "fp32"
+    return artefatos.get("mais_rapido", "fp32")
+
+
+def carregar_modelo(caminho, artefato="auto"):
+    """
+    Modelo pronto para inferência. artefato="auto" usa o mais rápido medido
+    pelo exportar_slm.py; se ele não puder ser aberto (ex.: onnxruntime não
+    instalado), cai no fp32.
+    """
+    if artefato == "auto":
+        artefato = artefato_mais_rapido(caminho)
+    if artefato == "onnx":
+        try:
+            return ModeloOnnx(caminho)
+        except ImportError:
+            artefato = "fp32"
+    modelo = AutoModelForSequenceClassification.from_pretrained(caminho)
+    if artefato == "int8":
+        modelo = quantizar_int8(modelo)
+        modelo.load_state_dict(torch.load(os.path.join(caminho, ARQUIVO_INT8)))
+    return modelo
+
+
+class ClassificadorSLM:
+    def __init__(self, modelo, tokenizer, nomes=None, batch_size=32, max_length=128, blocos_por_ordenacao=8):
+        self.modelo = modelo.eval()
+        self.tokenizer = tokenizer
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.tamanho_bloco = batch_size * blocos_por_ordenacao
+        # Rótulo de cada classe, na ordem dos logits (ex.: categorias_nomes)
+        nomes = nomes or modelo.config.id2label
+        self.nomes = np.array([nomes[i] for i in range(modelo.config.num_labels)], dtype=object)
+
+    @classmethod
+    def carregar(cls, caminho, nomes=None, artefato="auto", **kwargs):
+        modelo = carregar_modelo(caminho, artefato)
+        return cls(modelo, AutoTokenizer.from_pretrained(caminho), nomes, **kwargs)
+
+    def _probabilidades(self, textos):
+        entradas = self.tokenizer(textos, padding=True, truncation=True, max_length=self.max_length,
+                                  return_tensors="pt")
+        # O modelo recém-treinado pelo Trainer pode estar na GPU; o ONNX não tem device
+        device = getattr(self.modelo, "device", None)
+        if device is not None:
+            entradas = entradas.to(device)
+        with torch.inference_mode():
+            logits = self.modelo(**entradas).logits
+        return torch.softmax(logits, dim=-1).cpu().numpy()
+
+    def classificar_em_blocos(self, textos):
+        """Gera (textos, rotulos, confiancas) por bloco, na ordem de entrada"""
+        iterador = iter(textos)
+        while True:
+            bloco = list(islice(iterador, self.tamanho_bloco))
+            if not bloco:
+                return
+            ordem = np.argsort([len(texto) for texto in bloco], kind="stable")
+            probabilidades = np.empty((len(bloco), len(self.nomes)), dtype=np.float32)
+            for inicio in range(0, len(bloco), self.batch_size):
+                posicoes = ordem[inicio:inicio + self.batch_size]
+                probabilidades[posicoes] = self._probabilidades([bloco[i] for i in posicoes])
+            indices = probabilidades.argmax(axis=1)
+            yield bloco, self.nomes[indices], probabilidades[np.arange(len(bloco)), indices]
+
+    def classificar(self, textos):
+        """(rotulos, confiancas) como arrays, um por texto"""
+        rotulos, confiancas = [], []
+        for _, rotulos_bloco, confiancas_bloco in self.classificar_em_blocos(textos):
+            rotulos.append(rotulos_bloco)
+            confiancas.append(confiancas_bloco)
+        if not rotulos:
+            return np.empty(0, dtype=object), np.empty(0, dtype=np.float32)
+        return np.concatenate(rotulos), np.concatenate(confiancas)
+
+
+def ler_textos(caminho, coluna="texto"):
+    """Gera os textos de um .txt (um por linha), .jsonl ou .csv (campo `coluna`)"""
+    with open(caminho, encoding="utf-8", newline="") as arquivo:
+        if caminho.endswith(".csv"):
+            for linha in csv.DictReader(arquivo):
+                yield linha[coluna] or ""
+        elif caminho.endswith(".jsonl"):
+            for linha in arquivo:
+                if linha.strip():
+                    valor = json.loads(linha).get(coluna)
+                    yield "" if valor is None else valor
+        else:
+            for linha in arquivo:
+                yield linha.rstrip("\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Classifica um arquivo de textos em lote")
+    parser.add_argument("modelo", help="pasta do modelo salvo (ex.: ./meu_slm_categorias)")
+    parser.add_argument("entrada", help=".txt, .jsonl ou .csv")
+    parser.add_argument("--coluna", default="texto")
+    parser.add_argument("--saida", help=".jsonl de saída (padrão: tela)")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--max-length", type=int, default=128)
+    parser.add_argument("--artefato", default="auto", choices=["auto", "fp32", "int8", "onnx"])
+    args = parser.parse_args()
+
+    classificador = ClassificadorSLM.carregar(args.modelo, artefato=args.artefato,
+                                              batch_size=args.batch_size, max_length=args.max_length)
+    saida = open(args.saida, "w", encoding="utf-8") if args.saida else sys.stdout
+    total = 0
+    for textos, rotulos, confiancas in classificador.classificar_em_blocos(ler_textos(args.entrada, args.coluna)):
+        for texto, rotulo, confianca in zip(textos, rotulos, confiancas):
+            saida.write(json.dumps({"texto": texto, "rotulo": rotulo, "confianca": float(confianca)},
+                                   ensure_ascii=False) + "\n")
+        total += len(textos)
+    if args.saida:
+        saida.close()
+        print(f"{total} textos classificados -> {args.saida}")
@@ -0,0 +1,108 @@
+"""
+Ingestão do catálogo de REA
+===========================
+Percorre as páginas de resultados do MeCred e do Eduplay (com as mesmas
+requisições do `retrieve()`), remove duplicados pelo id, gera os embeddings
+em lotes grandes e grava o índice local usado pelo `retrieve(modo="local")`, junto com o
+índice BM25 de nome + descrição.
+
+Os textos codificados são os mesmos do modo online (título + descrição em
+pedaços, documentos.py); os vetores dos pedaços de cada recurso são
+juntados num só, então o índice continua com um vetor por recurso.
+
+Uso:
+    python ingestao.py "saude" "matematica" --max-paginas 50
+    python ingestao.py ""          # consulta vazia: catálogo inteiro, se a API permitir
+"""
+
+import argparse
+import time
+
+from bm25 import texto_lexico
+from codificador import codificar_lote
+from documentos import agrupar_vetores, preparar_documentos
+from fontes import FONTES, normalizar_itens
+from indices import INDICES
+import quantizacao  # registra os tipos fp16, int8 e binario em INDICES
+from indice_local import PASTA_PADRAO, salvar_indice
+from modelos import MODELO_PADRAO, obter_modelo
+
+
+def paginas_da_fonte(nome, assunto, max_paginas):
+    """Gera a lista de Recurso de cada página até a fonte parar de devolver novidades"""
+    busca = FONTES[nome].buscar
+    # Usa a função sem o cache de respostas: a ingestão não repete consultas
+    busca = getattr(busca, "__wrapped__", busca)
+    # Parâmetro de tamanho de página registrado no adaptador (fontes.py)
+    parametros = FONTES[nome].pagina
+    tamanho = next(iter(parametros.values()), None)
+
+    for pagina in range(1, max_paginas + 1):
+        itens = normalizar_itens(nome, busca(assunto, pagina=pagina, **parametros))
+        if not itens:
+            return
+        yield itens
+        if tamanho is not None and len(itens) < tamanho:
+            return
+
+
+def coletar(assuntos, fontes, max_paginas):
+    """Junta os itens de todas as fontes, sem repetir (fonte, id)"""
+    vistos = set()
+    itens = []
+    for nome in fontes:
+        if not FONTES[nome].pagina:
+            # Fonte sem paginação conhecida (ex.: Aquarela ainda sem API)
+            continue
+        for assunto in assuntos:
+            novos_na_consulta = 0
+            for pagina in paginas_da_fonte(nome, assunto, max_paginas):
+                novos = 0
+                for recurso in pagina:
+                    identificador = (nome, recurso.nome if recurso.id is None else recurso.id)
+                    if identificador in vistos:
+                        continue
+                    vistos.add(identificador)
+                    itens.append(recurso)
+                    novos += 1
+                novos_na_consulta += novos
+                # Algumas APIs repetem a última página em vez de devolver vazio
+                if novos == 0:
+                    break
+            print(f"  {nome} / '{assunto}': {novos_na_consulta} novos itens")
+    return itens
+
+
+def ingerir(assuntos, pasta=PASTA_PADRAO, fontes=None, max_paginas=20,
+            nome_modelo=MODELO_PADRAO, batch_size=256, tipo_indice="exato", **parametros):
+    inicio = time.perf_counter()
+    itens = coletar(assuntos, fontes or list(FONTES), max_paginas)
+    print(f"Total: {len(itens)} recursos ({time.perf_counter() - inicio:.1f}s)")
+    if not itens:
+        return 0
+
+    modelo = obter_modelo(nome_modelo)
+    textos, donos = preparar_documentos(itens, modelo)
+    inicio = time.perf_counter()
+    embeddings = agrupar_vetores(codificar_lote(modelo, textos, batch_size=batch_size), donos, itens)
+    print(f"Embeddings gerados em {time.perf_counter() - inicio:.1f}s")
+
+    salvar_indice(pasta, embeddings, itens, nome_modelo, tipo_indice,
+                  textos_lexicos=[texto_lexico(recurso) for recurso in itens], **parametros)
+    print(f"Índice ({tipo_indice}) salvo em: {pasta}")
+    return len(itens)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera o índice local de REA")
+    parser.add_argument("assuntos", nargs="*", default=[""],
+                        help="consultas usadas para percorrer as fontes")
+    parser.add_argument("--pasta", default=PASTA_PADRAO)
+    parser.add_argument("--fontes", nargs="*", default=None)
+    parser.add_argument("--max-paginas", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--indice", default="exato", choices=list(INDICES),
+                        help="exato (força bruta), aproximado (ivf, hnsw) ou compacto (fp16, int8, binario)")
+    args = parser.parse_args()
+    ingerir(args.assuntos, args.pasta, args.fontes, args.max_paginas,
+            batch_size=args.batch_size, tipo_indice=args.indice)
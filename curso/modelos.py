@@ -0,0 +1,48 @@
+"""
+Registro de modelos de embeddings
+=================================
+Carrega cada SentenceTransformer (e cada CrossEncoder, usado no
+reranqueamento) uma única vez por processo e reaproveita a mesma instância
+em todas as chamadas (retrieve, buscar_materia, etc).
+"""
+
+import threading
+
+from sentence_transformers import CrossEncoder, SentenceTransformer
+
+MODELO_PADRAO = 'paraphrase-multilingual-MiniLM-L12-v2'
+CROSS_ENCODER_PADRAO = 'cross-encoder/mmarco-mMiniLMv2-L12-H384-v1'
+
+_modelos = {}
+_trava = threading.Lock()
+
+
+def _carregar(classe, nome):
+    chave = (classe, nome)
+    modelo = _modelos.get(chave)
+    if modelo is not None:
+        return modelo
+    with _trava:
+        # Outra thread pode ter carregado enquanto esperávamos a trava
+        modelo = _modelos.get(chave)
+        if modelo is None:
+            modelo = classe(nome)
+            _modelos[chave] = modelo
+    return modelo
+
+
+def obter_modelo(nome=MODELO_PADRAO):
+    """Devolve o modelo `nome`, carregando na primeira vez que for pedido"""
+    return _carregar(SentenceTransformer, nome)
+
+
+def obter_cross_encoder(nome=CROSS_ENCODER_PADRAO):
+    """Mesmo registro, para os CrossEncoders do reranqueamento"""
+    return _carregar(CrossEncoder, nome)
+
+
+def aquecer_modelos(*nomes):
+    """Carrega os modelos já na inicialização (padrão: MODELO_PADRAO)"""
+    for nome in nomes or (MODELO_PADRAO,):
+        # Um encode curto já inicializa os pesos e os buffers do torch
+        obter_modelo(nome).encode(["aquecimento"])
@@ -0,0 +1,205 @@
+"""
+Índices com vetores quantizados
+===============================
+O modelo gera vetores de 384 posições em float32 (1,5 KB por recurso).
+Estes índices guardam os vetores numa forma compacta e buscam direto nela:
+
+- "fp16":    meia precisão (2 bytes por posição, metade da memória)
+- "int8":    1 byte por posição + uma escala float32 por vetor
+- "binario": 1 bit por posição (só o sinal, 32x menor). A busca usa a
+             distância de Hamming para pré-selecionar `fator_reavaliacao * k`
+             candidatos e reordena esses candidatos com o produto entre a
+             consulta em float e os sinais (±1) guardados.
+
+Todos seguem a interface de indices.py e podem ser escolhidos na ingestão
+(`python ingestao.py --indice int8`). Para comparar memória e recall@k:
+    python quantizacao.py --pasta indice_rea --k 10
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from busca_vetorial import normalizar, selecionar_top_k
+from indices import ARQUIVO_EMBEDDINGS, INDICES, IndiceExato, recall_em_k
+
+TAMANHO_BLOCO = 65536
+
+# Quantidade de bits 1 em cada valor de byte (0..255)
+_BITS_POR_BYTE = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+class _IndiceQuantizado:
+    """Base: guarda os arrays compactos e pontua a base em blocos"""
+    tipo = None
+    arquivos = ()
+
+    def __init__(self):
+        self.partes = None
+
+    def __len__(self):
+        return 0 if self.partes is None else len(self.partes[0])
+
+    def _quantizar(self, vetores):
+        raise NotImplementedError
+
+    def _pontuar(self, consultas, inicio, fim):
+        """Similaridades (consultas x vetores[inicio:fim]) em float32"""
+        raise NotImplementedError
+
+    def memoria_bytes(self):
+        return sum(parte.nbytes for parte in self.partes)
+
+    def construir(self, embeddings):
+        self.partes = self._quantizar(normalizar(embeddings))
+        return self
+
+    def adicionar(self, embeddings):
+        if self.partes is None:
+            return self.construir(embeddings)
+        novas = self._quantizar(normalizar(embeddings))
+        self.partes = tuple(np.concatenate([antiga, nova]) for antiga, nova in zip(self.partes, novas))
+        return self
+
+    def _similaridades(self, consultas):
+        # Só um bloco por vez é convertido para float32
+        total = len(self)
+        similaridades = np.empty((len(consultas), total), dtype=np.float32)
+        for inicio in range(0, total, TAMANHO_BLOCO):
+            fim = min(inicio + TAMANHO_BLOCO, total)
+            similaridades[:, inicio:fim] = self._pontuar(consultas, inicio, fim)
+        return similaridades
+
+    def buscar(self, consultas, k=5):
+        matriz_consultas = normalizar(np.atleast_2d(consultas))
+        return selecionar_top_k(self._similaridades(matriz_consultas), k)
+
+    def salvar(self, pasta):
+        os.makedirs(pasta, exist_ok=True)
+        for nome, parte in zip(self.arquivos, self.partes):
+            np.save(os.path.join(pasta, nome), parte)
+
+    @classmethod
+    def carregar(cls, pasta, **kwargs):
+        indice = cls(**kwargs)
+        indice.partes = tuple(np.load(os.path.join(pasta, nome), mmap_mode="r") for nome in cls.arquivos)
+        return indice
+
+
+class IndiceFP16(_IndiceQuantizado):
+    tipo = "fp16"
+    arquivos = ("embeddings_fp16.npy",)
+
+    def _quantizar(self, vetores):
+        return (vetores.astype(np.float16),)
+
+    def _pontuar(self, consultas, inicio, fim):
+        return consultas @ self.partes[0][inicio:fim].astype(np.float32).T
+
+
+class IndiceInt8(_IndiceQuantizado):
+    tipo = "int8"
+    arquivos = ("embeddings_int8.npy", "escalas_int8.npy")
+
+    def _quantizar(self, vetores):
+        escalas = np.abs(vetores).max(axis=1) / 127
+        escalas[escalas == 0] = 1.0
+        valores = np.round(vetores / escalas[:, None]).astype(np.int8)
+        return valores, escalas.astype(np.float32)
+
+    def _pontuar(self, consultas, inicio, fim):
+        valores, escalas = self.partes
+        return (consultas @ valores[inicio:fim].astype(np.float32).T) * escalas[inicio:fim]
+
+
+class IndiceBinario(_IndiceQuantizado):
+    tipo = "binario"
+    arquivos = ("embeddings_bits.npy",)
+
+    def __init__(self, fator_reavaliacao=10, dimensao=None):
+        super().__init__()
+        self.fator_reavaliacao = fator_reavaliacao
+        self.dimensao = dimensao
+
+    def _quantizar(self, vetores):
+        self.dimensao = vetores.shape[1]
+        return (np.packbits(vetores > 0, axis=1),)
+
+    def _sinais(self, indices):
+        """Os bits dos vetores escolhidos como ±1 em float32"""
+        bits = np.unpackbits(self.partes[0][indices], axis=1, count=self.dimensao)
+        return bits.astype(np.float32) * 2 - 1
+
+    def _pontuar(self, consultas, inicio, fim):
+        return consultas @ self._sinais(slice(inicio, fim)).T / np.sqrt(self.dimensao)
+
+    def _distancias_hamming(self, bits_consulta):
+        total = len(self)
+        distancias = np.empty(total, dtype=np.int32)
+        for inicio in range(0, total, TAMANHO_BLOCO):
+            bloco = self.partes[0][inicio:inicio + TAMANHO_BLOCO]
+            distancias[inicio:inicio + TAMANHO_BLOCO] = _BITS_POR_BYTE[bloco ^ bits_consulta].sum(axis=1)
+        return distancias
+
+    def buscar(self, consultas, k=5):
+        matriz_consultas = normalizar(np.atleast_2d(consultas))
+        total = len(self)
+        n_candidatos = min(total, max(k, k * self.fator_reavaliacao))
+        resultados = []
+        for consulta in matriz_consultas:
+            # 1) pré-seleção barata, só com XOR + contagem de bits
+            distancias = self._distancias_hamming(np.packbits(consulta > 0))
+            if n_candidatos < total:
+                candidatos = np.argpartition(distancias, n_candidatos - 1)[:n_candidatos]
+            else:
+                candidatos = np.arange(total)
+            # 2) reavaliação com a consulta em float
+            pontuacoes = consulta @ self._sinais(candidatos).T / np.sqrt(self.dimensao)
+            indices, similaridades = selecionar_top_k(pontuacoes[None, :], k)[0]
+            resultados.append((candidatos[indices], similaridades))
+        return resultados
+
+    @classmethod
+    def carregar(cls, pasta, **kwargs):
+        indice = super().carregar(pasta, **kwargs)
+        if indice.dimensao is None:
+            indice.dimensao = indice.partes[0].shape[1] * 8
+        return indice
+
+
+INDICES.update({"fp16": IndiceFP16, "int8": IndiceInt8, "binario": IndiceBinario})
+
+
+def relatorio(embeddings, consultas, k=10):
+    """Memória, tempo por consulta e recall@k de cada precisão, contra o float32 exato"""
+    exato = IndiceExato().construir(embeddings)
+    linhas = [{"tipo": "float32", "memoria_mb": exato.embeddings.nbytes / 2**20, f"recall@{k}": 1.0}]
+    for classe in (IndiceFP16, IndiceInt8, IndiceBinario):
+        indice = classe().construir(embeddings)
+        inicio = time.perf_counter()
+        indice.buscar(consultas, k)
+        tempo = (time.perf_counter() - inicio) / len(consultas) * 1000
+        linhas.append({
+            "tipo": classe.tipo,
+            "memoria_mb": indice.memoria_bytes() / 2**20,
+            "ms_por_consulta": tempo,
+            f"recall@{k}": recall_em_k(indice, exato, consultas, k),
+        })
+    return linhas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara as precisões de armazenamento dos vetores")
+    parser.add_argument("--pasta", default="indice_rea")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--consultas", type=int, default=200)
+    args = parser.parse_args()
+
+    embeddings = np.load(os.path.join(args.pasta, ARQUIVO_EMBEDDINGS))
+    gerador = np.random.default_rng(1)
+    amostra = embeddings[gerador.choice(len(embeddings), min(args.consultas, len(embeddings)), replace=False)]
+    consultas = amostra + gerador.normal(scale=0.05, size=amostra.shape).astype(np.float32)
+    for linha in relatorio(embeddings, consultas, args.k):
+        print(linha)
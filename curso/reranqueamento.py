@@ -0,0 +1,115 @@
+"""
+Reranqueamento com cross-encoder
+================================
+Segunda etapa opcional do `retrieve()`: os `n_candidatos` melhores do
+bi-encoder são pontuados de novo por um cross-encoder multilíngue, que lê a
+consulta e o recurso (nome + descrição) juntos e ordena melhor.
+
+O custo é limitado:
+- só os N primeiros candidatos são reavaliados, em lotes de `batch_size`;
+- pedidos simultâneos são juntados pelo MicroLote numa única chamada;
+- se a estimativa (ms por par, média móvel) ou a espera passar do
+  `orcamento_ms`, a ordem do bi-encoder é mantida.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import TimeoutError as TempoEsgotado
+
+import numpy as np
+
+from bm25 import texto_lexico
+from codificador import MicroLote
+from modelos import CROSS_ENCODER_PADRAO, obter_cross_encoder
+
+N_CANDIDATOS_PADRAO = int(os.getenv("REA_RERANK_N", "20"))
+ORCAMENTO_MS_PADRAO = float(os.getenv("REA_RERANK_ORCAMENTO_MS", "300"))
+# REA_RERANQUEAR=1: o serviço carrega o cross-encoder na inicialização (senão, no primeiro uso)
+AQUECER_NA_INICIALIZACAO = os.getenv("REA_RERANQUEAR", "0") == "1"
+
+
+class Reranqueador:
+    def __init__(self, nome_modelo=CROSS_ENCODER_PADRAO, n_candidatos=N_CANDIDATOS_PADRAO,
+                 batch_size=32, orcamento_ms=ORCAMENTO_MS_PADRAO, janela_ms=5):
+        self.modelo = obter_cross_encoder(nome_modelo)
+        self.n_candidatos = n_candidatos
+        self.batch_size = batch_size
+        self.orcamento_ms = orcamento_ms
+        self.ms_por_par = 0.0
+        self.contadores = {"reranqueados": 0, "fallbacks": 0}
+        self._trava = threading.Lock()
+        self._lote = MicroLote(self._pontuar_listas, janela_ms=janela_ms)
+
+    def _pontuar_listas(self, listas):
+        pares = [par for lista in listas for par in lista]
+        inicio = time.perf_counter()
+        pontuacoes = np.asarray(self.modelo.predict(pares, batch_size=self.batch_size))
+        ms_por_par = (time.perf_counter() - inicio) * 1000 / max(len(pares), 1)
+        with self._trava:
+            # Média móvel: acompanha a carga da máquina sem oscilar demais
+            self.ms_por_par = ms_por_par if not self.ms_por_par else 0.8 * self.ms_por_par + 0.2 * ms_por_par
+        fim = np.cumsum([len(lista) for lista in listas])
+        return np.split(pontuacoes, fim[:-1])
+
+    def aquecer(self):
+        self.modelo.predict([("aquecimento", "aquecimento")])
+
+    def _manter_ordem(self, candidatos, top_k):
+        with self._trava:
+            self.contadores["fallbacks"] += 1
+        return candidatos[:top_k]
+
+    def reordenar(self, consulta, candidatos, top_k=5):
+        """
+        Reordena os `n_candidatos` primeiros candidatos (já em ordem do
+        bi-encoder), com o campo `reranqueamento` preenchido, e devolve os top_k;
+        os demais entram depois, na ordem do bi-encoder, quando top_k passa de
+        n_candidatos. Fora do orçamento, devolve os top_k originais.
+        """
+        candidatos = list(candidatos)
+        avaliados, restantes = candidatos[:self.n_candidatos], candidatos[self.n_candidatos:]
+        if len(avaliados) <= 1:
+            return candidatos[:top_k]
+        if self.ms_por_par * len(avaliados) > self.orcamento_ms:
+            with self._trava:
+                # Sem medições novas a estimativa nunca baixaria; decai aos poucos
+                # para que o cross-encoder volte a ser tentado quando a carga cair
+                self.ms_por_par *= 0.95
+            return self._manter_ordem(candidatos, top_k)
+
+        pares = [(consulta, texto_lexico(recurso)) for recurso in avaliados]
+        try:
+            pontuacoes = self._lote.executar(pares, timeout=self.orcamento_ms / 1000)
+        except TempoEsgotado:
+            return self._manter_ordem(candidatos, top_k)
+
+        with self._trava:
+            self.contadores["reranqueados"] += 1
+        ordem = np.argsort(-pontuacoes, kind="stable")
+        reordenados = [avaliados[i]._replace(reranqueamento=float(pontuacoes[i])) for i in ordem]
+        return (reordenados + restantes)[:top_k]
+
+    def estatisticas(self):
+        with self._trava:
+            return {**self.contadores, "ms_por_par": self.ms_por_par,
+                    "n_candidatos": self.n_candidatos, "orcamento_ms": self.orcamento_ms}
+
+
+_reranqueador = None
+_trava_reranqueador = threading.Lock()
+
+
+def obter_reranqueador():
+    """Reranqueador compartilhado pelo processo"""
+    global _reranqueador
+    with _trava_reranqueador:
+        if _reranqueador is None:
+            _reranqueador = Reranqueador()
+    return _reranqueador
+
+
+def reranqueador_carregado():
+    """O reranqueador compartilhado se já foi criado, sem carregar o modelo (None se não)"""
+    with _trava_reranqueador:
+        return _reranqueador
@@ -0,0 +1,165 @@
+"""
+Serviço HTTP de busca de REA
+============================
+Mantém o modelo carregado e responde o `retrieve()` por HTTP. Os pedidos
+simultâneos são codificados juntos pelo MicroLote (codificador.py), que
+espera no máximo REA_JANELA_MS milissegundos para formar cada lote.
+
+Uso:
+    pip install fastapi uvicorn
+    python servico.py --porta 8000
+
+Endpoints:
+    GET /retrieve?q=...&k=5&modo=online   -> JSON com os recursos
+                  (&lexico=rrf|ponderado|prefiltro junta a busca BM25;
+                   &reranquear=true reavalia com o cross-encoder)
+    GET /formatted?q=...&k=5              -> texto pronto para leitura
+                  (&formato=jsonl devolve um JSON por linha)
+    GET /retrieve/stream?q=...&k=5        -> NDJSON, uma linha a cada fonte que responde
+    GET /health                           -> situação do serviço
+    GET /metrics                          -> contadores e latências
+
+O cross-encoder só é carregado no primeiro pedido com reranquear=true; com
+REA_RERANQUEAR=1 ele é carregado já na inicialização.
+"""
+
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from Rag import retrieve, retrieveIncremental
+from formatacao import linhas_jsonl, linhas_texto
+from cache_consultas import obter_cache_consultas
+from cache_respostas import cache_padrao
+from codificador import obter_codificador
+from modelos import MODELO_PADRAO, aquecer_modelos
+from reranqueamento import AQUECER_NA_INICIALIZACAO, obter_reranqueador, reranqueador_carregado
+
+
+class Metricas:
+    def __init__(self, janela=1000):
+        self._trava = threading.Lock()
+        self._latencias = deque(maxlen=janela)
+        self.pedidos = 0
+        self.erros = 0
+        self.inicio = time.time()
+
+    def registrar(self, segundos, erro=False):
+        with self._trava:
+            self.pedidos += 1
+            self.erros += int(erro)
+            self._latencias.append(segundos)
+
+    def resumo(self):
+        with self._trava:
+            latencias = np.array(self._latencias) * 1000
+            resumo = {"pedidos": self.pedidos, "erros": self.erros,
+                      "em_execucao_s": time.time() - self.inicio}
+        if len(latencias):
+            for p in (50, 95, 99):
+                resumo[f"latencia_p{p}_ms"] = float(np.percentile(latencias, p))
+        return resumo
+
+
+metricas = Metricas()
+
+
+@asynccontextmanager
+async def ciclo_de_vida(app):
+    # O custo de carregar o modelo fica na inicialização, não no primeiro pedido
+    aquecer_modelos()
+    # O reranqueamento é opcional: sem REA_RERANQUEAR=1 o segundo modelo não é carregado
+    if AQUECER_NA_INICIALIZACAO:
+        obter_reranqueador().aquecer()
+    yield
+
+
+app = FastAPI(title="Busca de REA", lifespan=ciclo_de_vida)
+
+
+def _como_json(resultados):
+    return [recurso._asdict() for recurso in resultados]
+
+
+def _executar(consulta, k, modo, lexico, reranquear):
+    inicio = time.perf_counter()
+    try:
+        resultado = retrieve(consulta, k, modo, lexico, reranquear)
+    except FileNotFoundError:
+        metricas.registrar(time.perf_counter() - inicio, erro=True)
+        raise HTTPException(503, "Índice local não encontrado; rode o ingestao.py")
+    except Exception as erro:
+        metricas.registrar(time.perf_counter() - inicio, erro=True)
+        raise HTTPException(502, f"Falha ao buscar os recursos: {erro}")
+    metricas.registrar(time.perf_counter() - inicio)
+    return resultado
+
+
+# Rotas síncronas rodam no pool de threads do FastAPI; é isso que permite
+# ao MicroLote juntar pedidos simultâneos
+@app.get("/retrieve")
+def rota_retrieve(q: str, k: int = Query(5, ge=1, le=100), modo: str = "online",
+                  lexico: Optional[str] = None, reranquear: bool = False):
+    return _como_json(_executar(q, k, modo, lexico, reranquear))
+
+
+@app.get("/retrieve/stream")
+async def rota_retrieve_stream(q: str, k: int = Query(5, ge=1, le=100), apenas_novos: bool = False):
+    async def linhas():
+        inicio = time.perf_counter()
+        async for fonte, resultados in retrieveIncremental(q, k, apenas_novos):
+            yield json.dumps({"fonte": fonte, "resultados": _como_json(resultados)}, ensure_ascii=False) + "\n"
+        metricas.registrar(time.perf_counter() - inicio)
+
+    return StreamingResponse(linhas(), media_type="application/x-ndjson")
+
+
+@app.get("/formatted", response_class=PlainTextResponse)
+def rota_formatted(q: str, k: int = Query(5, ge=1, le=100), modo: str = "online",
+                   lexico: Optional[str] = None, reranquear: bool = False, formato: str = "texto"):
+    resultados = _executar(q, k, modo, lexico, reranquear)
+    # As linhas são enviadas conforme ficam prontas, sem juntar tudo numa string
+    if formato == "jsonl":
+        return StreamingResponse(linhas_jsonl(resultados), media_type="application/x-ndjson")
+    return StreamingResponse(linhas_texto(resultados), media_type="text/plain; charset=utf-8")
+
+
+@app.get("/health")
+def rota_health():
+    return {"status": "ok", "modelo": MODELO_PADRAO}
+
+
+@app.get("/metrics")
+def rota_metrics():
+    lotes = obter_codificador(MODELO_PADRAO).contadores
+    resposta = {
+        **metricas.resumo(),
+        "codificador": {
+            **lotes,
+            "media_por_lote": lotes["itens"] / lotes["lotes"] if lotes["lotes"] else 0.0,
+        },
+        "cache_respostas": cache_padrao.estatisticas(),
+        "cache_consultas": obter_cache_consultas(MODELO_PADRAO).estatisticas(),
+    }
+    reranqueador = reranqueador_carregado()
+    if reranqueador is not None:
+        resposta["reranqueamento"] = reranqueador.estatisticas()
+    return resposta
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço HTTP de busca de REA")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8000)
+    args = parser.parse_args()
+    # Um único processo: o modelo e os lotes são compartilhados entre os pedidos
+    uvicorn.run(app, host=args.host, port=args.porta)
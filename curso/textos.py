@@ -0,0 +1,15 @@
+"""
+Normalização de textos
+======================
+Só com a biblioteca padrão: usada pelas chaves do cache de consultas e pela
+tokenização da BM25, que assim pode ser importada sem o modelo (nem o torch).
+"""
+
+import unicodedata
+
+
+def normalizar_consulta(consulta):
+    """Minúsculas, sem acentos (NFKD) e com os espaços colapsados"""
+    decomposta = unicodedata.normalize("NFKD", consulta.casefold())
+    sem_acentos = "".join(c for c in decomposta if not unicodedata.combining(c))
+    return " ".join(sem_acentos.split())
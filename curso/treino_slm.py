@@ -0,0 +1,73 @@
+"""
+Treino dos SLMs com padding dinâmico
+====================================
+Com `padding='max_length'` todo exemplo vira `max_length` tokens, e a maior
+parte de cada batch é padding que a atenção processa à toa. Aqui a
+tokenização só trunca; o `DataCollatorWithPadding` completa cada batch até
+o maior texto *dele*, e o `group_by_length` do Trainer junta textos de
+tamanho parecido no mesmo batch.
+
+SLM_PADDING=fixo volta ao comportamento antigo, para comparar. Cada treino
+grava os tokens por segundo em medicoes_padding.json (por script e modo).
+"""
+
+import json
+import os
+
+from transformers import DataCollatorWithPadding, default_data_collator
+
+MODO_PADDING = os.getenv("SLM_PADDING", "dinamico")
+ARQUIVO_MEDICOES = "medicoes_padding.json"
+
+
+def funcao_tokenizar(tokenizer, coluna, max_length, modo=MODO_PADDING):
+    """Função para o `dataset.map(..., batched=True)`"""
+    padding = "max_length" if modo == "fixo" else False
+
+    def tokenizar(batch):
+        return tokenizer(batch[coluna], padding=padding, truncation=True, max_length=max_length)
+    return tokenizar
+
+
+def opcoes_treino(tokenizer, modo=MODO_PADDING):
+    """
+    Parâmetros extras para TrainingArguments e para o Trainer:
+        args, extras_trainer = opcoes_treino(tokenizer)
+        TrainingArguments(..., **args); Trainer(..., **extras_trainer)
+    """
+    if modo == "fixo":
+        return {}, {"data_collator": default_data_collator}
+    return {"group_by_length": True}, {"data_collator": DataCollatorWithPadding(tokenizer)}
+
+
+def contar_tokens(dataset_tokenizado):
+    """Tokens de verdade (sem padding) em uma passada pelo dataset"""
+    return sum(sum(mascara) for mascara in dataset_tokenizado["attention_mask"])
+
+
+def registrar_vazao(script, dataset_tokenizado, resultado_treino, epocas, modo=MODO_PADDING,
+                    arquivo=ARQUIVO_MEDICOES):
+    """
+    Grava os tokens úteis por segundo deste treino e, se o outro modo já foi
+    medido para o mesmo script, mostra a comparação.
+    """
+    tempo = resultado_treino.metrics["train_runtime"]
+    tokens = contar_tokens(dataset_tokenizado) * epocas
+    medicoes = {}
+    if os.path.exists(arquivo):
+        with open(arquivo, encoding="utf-8") as entrada:
+            medicoes = json.load(entrada)
+    medicoes.setdefault(script, {})[modo] = {
+        "tokens_por_s": tokens / tempo,
+        "exemplos_por_s": resultado_treino.metrics.get("train_samples_per_second"),
+        "tempo_s": tempo,
+    }
+    with open(arquivo, "w", encoding="utf-8") as saida:
+        json.dump(medicoes, saida, ensure_ascii=False, indent=2)
+
+    print(f"✓ Vazão ({modo}): {tokens / tempo:,.0f} tokens úteis/s")
+    medidos = medicoes[script]
+    if "fixo" in medidos and "dinamico" in medidos:
+        ganho = medidos["dinamico"]["tokens_por_s"] / medidos["fixo"]["tokens_por_s"]
+        print(f"  Padding dinâmico vs fixo: {ganho:.2f}x")
+    return medicoes[script]